@@ -2,9 +2,22 @@ import pandas as pd
 import qrcode
 from PIL import Image, ImageDraw, ImageFont, ImageColor
 import os
+import sys
+import csv
 import json
+import argparse
 import urllib.parse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.preflight import new_report, check_records, write_report
+from common.progress import ProgressReporter
+from common.sharding import add_shard_arguments, in_shard, shard_suffix
+from common.print_layout import PAGE_SIZES, DEFAULT_DPI
+from common.group_pdf import GroupedPdfWriter, parse_group_page_size
+from common.memwatch import MemoryLimitExceeded, add_memory_arguments, monitor_from_args
+from common.template_variants import (TemplateVariantCache, add_template_arguments, missing_templates,
+                                      variant_template)
+
 def create_transparent_qr(data):
     """Create a QR code with transparent background"""
     qr = qrcode.QRCode(
@@ -33,7 +46,80 @@ def create_transparent_qr(data):
     qr_img.putdata(new_data)
     return qr_img
 
-def create_id_card(name, email, faculty):
+def load_card_font(font_path="./font.otf"):
+    """Load the font used for the name on the card"""
+    try:
+        font = ImageFont.truetype(font_path, 60)  # Changed to 16px
+    except IOError:
+        print("Custom font not found, using system font.")
+        try:
+            font = ImageFont.truetype("/usr/share/fonts/TTF/DejaVuSans.ttf", 60)  # Changed to 16px
+        except IOError:
+            try:
+                font = ImageFont.truetype(font_path, 60)  # Changed to 16px
+            except IOError:
+                font = ImageFont.load_default()
+    return font
+
+def card_layout(card_size):
+    """
+    Positions on a card that only depend on the template size
+    
+    Args:
+        card_size (tuple): Template (width, height)
+    
+    Returns:
+        dict: 'qr_size', 'qr_position' (top-left of the QR background) and
+              'text_y' (top of the name)
+    """
+    card_width, card_height = card_size
+    qr_size = min(card_width // 3, card_height // 2)  # Appropriate size for the template
+    qr_bg_size = (qr_size - 1, qr_size - 1)
+    qr_position = ((card_width - qr_bg_size[0]) // 2, (card_height - qr_bg_size[1]) // 2 - 20)
+    # The name is centered horizontally 180px below the QR code
+    return {'qr_size': qr_size, 'qr_position': qr_position, 'text_y': qr_position[1] + qr_bg_size[1] + 180}
+
+def load_card_assets(template_image="card.png", font_path="./font.otf"):
+    """
+    Decode the card template and load the font once for many cards
+    
+    Args:
+        template_image (str): Card template image
+        font_path (str): Font used for the name
+    
+    Returns:
+        dict: 'template' (RGBA image, or None if the file is missing), 'font'
+              and 'layout' (see card_layout, None without a template)
+    """
+    try:
+        with Image.open(template_image) as template:
+            template = template.convert('RGBA')
+    except FileNotFoundError:
+        template = None
+    layout = card_layout(template.size) if template else None
+    return {'template': template, 'font': load_card_font(font_path), 'layout': layout}
+
+def card_filename(name, output_folder="id_cards"):
+    """Output path of the ID card for a name"""
+    return f"{output_folder}/{name.replace(' ', '_')}_id_card.png"
+
+def create_id_card(name, email, faculty, assets=None, output_folder="id_cards", on_card=None):
+    """
+    Create and save the ID card for one participant
+    
+    Args:
+        name (str): Participant name
+        email (str): Participant email
+        faculty (str): Participant faculty
+        assets (dict): Preloaded template and font from load_card_assets; if
+                       omitted they are loaded from the current folder
+        output_folder (str): Folder for the generated card
+        on_card (callable): Called with the finished card image, e.g. to add
+                            it to a PDF without reading it back from disk
+    
+    Returns:
+        str: Path of the saved card
+    """
     # Combine data for QR code
     # Split name into parts
     raw = "<URL GOES HERE FOR THE QR CODE>"
@@ -50,15 +136,24 @@ def create_id_card(name, email, faculty):
     qr_img = create_transparent_qr(qr_data)
     
     try:
-        # Open the template image
-        template = Image.open("card.png")
-        template = template.convert('RGBA')
+        if assets is None:
+            # Open the template image
+            template = Image.open("card.png")
+            template = template.convert('RGBA')
+        elif assets['template'] is None:
+            raise FileNotFoundError("card.png")
+        else:
+            # Reuse the template decoded once by load_card_assets
+            template = assets['template'].copy()
         
         # Get dimensions
         card_width, card_height = template.size
         
+        # QR and name positions are precomputed once per template variant
+        layout = assets['layout'] if assets else card_layout(template.size)
+        
         # Resize QR code if needed (adjust size as needed)
-        qr_size = min(card_width // 3, card_height // 2)  # Appropriate size for the template
+        qr_size = layout['qr_size']
         qr_img = qr_img.resize((qr_size, qr_size), Image.LANCZOS)
         qr_width, qr_height = qr_img.size
         
@@ -70,7 +165,7 @@ def create_id_card(name, email, faculty):
         qr_bg.paste(qr_img, qr_img)  # 5px from each edge
         
         # Center the QR code with background on the template
-        qr_position = ((card_width - qr_bg_size[0]) // 2, (card_height - qr_bg_size[1]) // 2 - 20)
+        qr_position = layout['qr_position']
         
         # Paste QR code with white background and transparency preserved
         template.paste(qr_bg, qr_position, qr_bg)
@@ -79,24 +174,14 @@ def create_id_card(name, email, faculty):
         draw = ImageDraw.Draw(template)
         
         # Try to load a font, fall back to default if needed
-        try:
-            font = ImageFont.truetype("./font.otf", 60)  # Changed to 16px
-        except IOError:
-            print("Custom font not found, using system font.")
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/TTF/DejaVuSans.ttf", 60)  # Changed to 16px
-            except IOError:
-                try:
-                    font = ImageFont.truetype("./font.otf", 60)  # Changed to 16px
-                except IOError:
-                    font = ImageFont.load_default()
+        font = assets['font'] if assets else load_card_font()
         
         # Center the text below QR code
         name=name.upper()
         text_width = draw.textlength(name, font=font)
         # text_position = ((card_width - text_width) // 2, qr_position[1] + qr_bg_size[1] + 20)
         # text position need to be center horizontally and 20px below the QR code
-        text_position = ((card_width - text_width) // 2, qr_position[1] + qr_bg_size[1] + 180)
+        text_position = ((card_width - text_width) // 2, layout['text_y'])
 
 
         
@@ -140,28 +225,185 @@ def create_id_card(name, email, faculty):
             draw.text(text_position, name, fill="white", font=font)
     
     # Create directory for output if it doesn't exist
-    os.makedirs("id_cards", exist_ok=True)
+    os.makedirs(output_folder, exist_ok=True)
     
     # Save the ID card
-    filename = f"id_cards/{name.replace(' ', '_')}_id_card.png"
+    filename = card_filename(name, output_folder)
     template.save(filename)
-    print(f"Created ID card for {name} at {filename}")
+    if on_card:
+        on_card(template)
     
+    # Release the pixels now instead of waiting for the garbage collector
+    template.close()
     return filename
 
+def open_failed_log(failed_file):
+    """Start the failure log; records are appended as they fail instead of kept in memory"""
+    f = open(failed_file, "w")
+    f.write("FAILED ID CARD CREATION RECORDS\n")
+    f.write("=" * 50 + "\n\n")
+    return f
+
+def write_failed_record(f, record):
+    """Append one failed record to the failure log"""
+    f.write(f"Row: {record['index']}\n")
+    f.write(f"Name: {record['name']}\n")
+    f.write(f"Email: {record['email']}\n")
+    f.write(f"Faculty: {record['faculty']}\n")
+    f.write(f"Reason: {record['reason']}\n")
+    f.write("-" * 30 + "\n")
+
+def read_participant_records(csv_file):
+    """Yield (row number, fields) for every CSV row, resolving the same column names as main"""
+    with open(csv_file, 'r', newline='', encoding='utf-8') as file:
+        for index, row in enumerate(csv.DictReader(file, restval='')):
+            yield index + 1, {
+                'name': row.get('Full Name', row.get('name', '')) or '',
+                'email': row.get('Email Address', row.get('email', '')) or '',
+                'faculty': row.get('Faculty', row.get('faculty', '')) or '',
+            }
+
+def preflight_id_cards(excel_file="ParticipantList.csv", template_image="card.png", margin=50,
+                       report_file="preflight_report.txt"):
+    """
+    Validate the participant list and lay out every name without rendering
+    
+    Checks for empty rows, missing names or emails, names wider than the card,
+    characters missing from the font and names that map to the same card file.
+    
+    Args:
+        excel_file (str): Participant CSV file
+        template_image (str): Card template (only its size is read)
+        margin (int): Minimum space to keep on each side of the name, in pixels
+        report_file (str): Where to write the detailed report
+    
+    Returns:
+        bool: True if no problems were found
+    """
+    if not os.path.exists(excel_file):
+        print(f"Error: CSV file '{excel_file}' not found.")
+        return False
+    
+    # Same fallback size as create_id_card when the template is missing
+    if os.path.exists(template_image):
+        with Image.open(template_image) as template:
+            card_width = template.width
+    else:
+        print(f"Warning: Template '{template_image}' not found. Checking against plain card.")
+        card_width = 500
+    
+    font = load_card_font()
+    records = ((row_number, dict(fields, name=fields['name'].upper()))
+               for row_number, fields in read_participant_records(excel_file))
+    report = new_report(excel_file)
+    check_records(report, records, font, max_width=card_width - 2 * margin,
+                  filename_for=card_filename, required_fields=('name', 'email'))
+    return write_report(report, report_file)
+
 def main():
+    parser = argparse.ArgumentParser(description="Generate ID cards from the participant list")
+    parser.add_argument("--preflight", action="store_true",
+                       help="Validate the CSV and measure every name without rendering")
+    add_shard_arguments(parser)
+    parser.add_argument("--group-by", metavar="COLUMN", default=None,
+                       help="Also write one combined PDF per value of this column, e.g. Faculty")
+    parser.add_argument("--only-group", action="append", metavar="VALUE",
+                       help="Only generate cards whose --group-by value matches (can be repeated)")
+    parser.add_argument("--group-pdf-dir", default="group_pdfs",
+                       help="Folder for the per-group PDFs")
+    parser.add_argument("--page-size", choices=sorted(PAGE_SIZES), default=None,
+                       help="Page size for the per-group PDFs (default: page per image pixel size)")
+    parser.add_argument("--group-page-size", action="append", type=parse_group_page_size, default=[],
+                       metavar="GROUP=SIZE", help="Page size for one group, e.g. BE=CR80 (can be repeated)")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI,
+                       help="Target print resolution for fixed page sizes")
+    add_memory_arguments(parser)
+    add_template_arguments(parser)
+    
+    args = parser.parse_args()
+    if args.only_group and not args.group_by:
+        parser.error("--only-group requires --group-by")
+    if (args.template_variants or args.sort_by_template) and not args.template_column:
+        parser.error("--template and --sort-by-template require --template-column")
+    
+    if args.preflight:
+        if not preflight_id_cards():
+            sys.exit(1)
+        return
+    
+    memory = monitor_from_args(args)
     try:
         # Read the CSV file
         excel_file = "ParticipantList.csv"  # Adjust filename if needed
-        df = pd.read_csv(excel_file)
+        with memory.stage("read_csv"):
+            df = pd.read_csv(excel_file)
+        failed_file = f"faileddata{shard_suffix(args.shard)}.txt"
+        
+        # Keep only this node's slice; the index still holds the original row positions
+        if args.shard:
+            total_rows = len(df)
+            keep = [in_shard(args.shard, index + 1, row.get('Full Name', row.get('name', '')),
+                             args.shard_strategy, total_rows)
+                    for index, row in df.iterrows()]
+            df = df[keep]
+            print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(df)} of {total_rows} records")
+        
+        group_writer = None
+        if args.group_by:
+            if args.group_by not in df.columns:
+                print(f"Error: Column '{args.group_by}' not found in {excel_file}.")
+                return
+            groups = df[args.group_by].fillna('').astype(str).str.strip()
+            
+            # Re-print selected groups without touching the rest of the batch
+            if args.only_group:
+                df = df[groups.isin(args.only_group)]
+                groups = groups[df.index]
+                print(f"Groups {', '.join(args.only_group)}: {len(df)} records")
+            
+            group_writer = GroupedPdfWriter(args.group_pdf_dir, PAGE_SIZES.get(args.page_size),
+                                            dict(args.group_page_size), args.dpi)
+        
+        # Choose each row's template through the column-to-template mapping
+        template_image = "card.png"
+        variants = None
+        if args.template_column:
+            if args.template_column not in df.columns:
+                print(f"Error: Column '{args.template_column}' not found in {excel_file}.")
+                return
+            template_variants = dict(args.template_variants)
+            missing = missing_templates(template_variants)
+            if missing:
+                for path in missing:
+                    print(f"Error: Template '{path}' not found.")
+                return
+            variants = df[args.template_column].fillna('').astype(str).map(
+                lambda value: variant_template(template_variants, value, template_image))
+            
+            # A stable sort keeps the CSV order within each variant
+            if args.sort_by_template:
+                df = df.loc[variants.sort_values(kind='stable').index]
+        
+        # Keep each group's rows together so every group PDF is written in one
+        # piece instead of being split into parts; the stable sort keeps the
+        # CSV (or --sort-by-template) order within each group
+        if group_writer:
+            df = df.loc[groups[df.index].sort_values(kind='stable').index]
         
         print(f"Processing {len(df)} records from {excel_file}...")
         
-        # Initialize lists to track success and failures
-        failed_records = []
+        # Failures are streamed to the log file as they happen
+        failed_log = None
+        failed_count = 0
         successful_count = 0
+        progress = ProgressReporter("id_cards", total=len(df))
+        
+        # Decode each template variant and load the font once, keeping the
+        # most recently used variants in memory
+        templates = TemplateVariantCache(load_card_assets, args.max_templates)
         
         # Process each row in the CSV file
+        memory.start_stage("render")
         for index, row in df.iterrows():
             try:
                 # Get data, checking multiple possible column name formats
@@ -171,56 +413,70 @@ def main():
                 
                 # Only create card if there's a name and email
                 if name and email:
-                    create_id_card(name, email, faculty)
+                    assets = templates.get(variants[index] if variants is not None else template_image)
+                    on_card = None
+                    if group_writer:
+                        on_card = lambda card, group=groups[index]: group_writer.add(group, card)
+                    create_id_card(name, email, faculty, assets=assets, on_card=on_card)
                     successful_count += 1
+                    progress.advance()
                 else:
                     # Record missing data
-                    failed_records.append({
+                    failed_log = failed_log or open_failed_log(failed_file)
+                    failed_count += 1
+                    write_failed_record(failed_log, {
                         'index': index + 1,
                         'name': name,
                         'email': email,
                         'faculty': faculty,
                         'reason': 'Missing name or email'
                     })
-                
-                # Progress indicator for large datasets
-                if index > 0 and index % 10 == 0:
-                    print(f"Processed {index} records...")
+                    progress.advance(failed=1)
                 
             except Exception as e:
                 # Record failed creation
-                failed_records.append({
+                failed_log = failed_log or open_failed_log(failed_file)
+                failed_count += 1
+                write_failed_record(failed_log, {
                     'index': index + 1,
                     'name': row.get('Full Name', row.get('name', 'Unknown')),
                     'email': row.get('Email Address', row.get('email', 'Unknown')),
                     'faculty': str(row.get('Faculty', row.get('faculty', 'Unknown'))),
                     'reason': str(e)
                 })
-                print(f"Failed to create ID card for row {index + 1}: {e}")
+                progress.log(f"Failed to create ID card for row {index + 1}: {e}")
+                progress.advance(failed=1)
             
             # Remove the break statement to process all records
             # break
         
-        # Write failed records to file if any
-        if failed_records:
-            with open("faileddata.txt", "w") as f:
-                f.write("FAILED ID CARD CREATION RECORDS\n")
-                f.write("=" * 50 + "\n\n")
-                for record in failed_records:
-                    f.write(f"Row: {record['index']}\n")
-                    f.write(f"Name: {record['name']}\n")
-                    f.write(f"Email: {record['email']}\n")
-                    f.write(f"Faculty: {record['faculty']}\n")
-                    f.write(f"Reason: {record['reason']}\n")
-                    f.write("-" * 30 + "\n")
-            
-            print(f"\n{len(failed_records)} records failed. Details saved to 'faileddata.txt'")
+            memory.sample()
+        
+        progress.close()
+        memory.end_stage()
+        
+        if group_writer:
+            with memory.stage("group_pdfs"):
+                group_files = group_writer.close()
+            print(f"Group PDFs: {len(group_files)} files in '{args.group_pdf_dir}'")
+        
+        if failed_log:
+            failed_log.close()
+            print(f"\n{failed_count} records failed. Details saved to '{failed_file}'")
         
         print(f"\nSummary:")
         print(f"Successfully created: {successful_count} ID cards")
-        print(f"Failed: {len(failed_records)} records")
+        print(f"Failed: {failed_count} records")
         print("All ID cards processing completed!")
+        if variants is not None:
+            stats = templates.stats()
+            print(f"Template variants: {stats['misses']} decoded, {stats['evictions']} evicted "
+                  f"({stats['hit_rate']:.0%} hit rate)")
+        memory.print_summary()
         
+    except MemoryLimitExceeded as e:
+        print(f"Stopped: {e}")
+        sys.exit(1)
     except FileNotFoundError:
         print(f"Error: CSV file '{excel_file}' not found.")
     except Exception as e:
@@ -229,4 +485,4 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
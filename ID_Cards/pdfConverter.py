@@ -1,12 +1,18 @@
 import os
 from PIL import Image
+import sys
 import glob
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
 import argparse
 
-def images_to_pdf(image_folder="id_cards", output_pdf="id_cards.pdf", cards_per_page=1):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.print_layout import PAGE_SIZES, DEFAULT_DPI, fit_image_to_page
+from common.progress import ProgressReporter
+
+def images_to_pdf(image_folder="id_cards", output_pdf="id_cards.pdf", cards_per_page=1, page_size=None, dpi=DEFAULT_DPI):
     """
     Convert ID card images to PDF format keeping exact original image size
     
@@ -14,6 +20,9 @@ def images_to_pdf(image_folder="id_cards", output_pdf="id_cards.pdf", cards_per_
         image_folder (str): Folder containing ID card images
         output_pdf (str): Output PDF filename
         cards_per_page (int): Number of cards per page (default: 1 for full size)
+        page_size (tuple): Physical page size in points; if set, every image is
+                           resampled to `dpi` and centered on a page of this size
+        dpi (int): Target print resolution when page_size is set
     """
     
     # Check if the image folder exists
@@ -33,57 +42,72 @@ def images_to_pdf(image_folder="id_cards", output_pdf="id_cards.pdf", cards_per_
     image_files.sort()
     
     print(f"Found {len(image_files)} ID card images")
-    print(f"Creating PDF with exact image sizes...")
+    if page_size:
+        print(f"Creating PDF with {page_size[0] / inch:.2f}x{page_size[1] / inch:.2f} inch pages at {dpi} DPI...")
+        img_width, img_height = page_size
+    else:
+        print(f"Creating PDF with exact image sizes...")
     
-    # Create PDF with first image dimensions
-    first_img = Image.open(image_files[0])
-    img_width, img_height = first_img.size
+        # Create PDF with first image dimensions
+        with Image.open(image_files[0]) as first_img:
+            img_width, img_height = first_img.size
     
     # Create PDF with exact image size
     c = canvas.Canvas(output_pdf, pagesize=(img_width, img_height))
     
+    progress = ProgressReporter("pdf", total=len(image_files))
+    
     for i, image_path in enumerate(image_files):
         try:
             # Open image
-            img = Image.open(image_path)
-            current_width, current_height = img.size
+            with Image.open(image_path) as img:
+                current_width, current_height = img.size
             
-            # If image size is different from first image, create new page with that size
-            if current_width != img_width or current_height != img_height:
-                if i > 0:  # Save current page before creating new one
-                    c.showPage()
-                # Set new page size for this image
-                c.setPageSize((current_width, current_height))
-                img_width, img_height = current_width, current_height
+                if page_size:
+                    # Resample once to the print resolution and center on the fixed page
+                    page_img, x, y, draw_width, draw_height = fit_image_to_page(img, page_size, dpi)
+                    c.drawImage(ImageReader(page_img), x, y, width=draw_width, height=draw_height)
+                else:
+                    # If image size is different from first image, create new page with that size
+                    if current_width != img_width or current_height != img_height:
+                        if i > 0:  # Save current page before creating new one
+                            c.showPage()
+                        # Set new page size for this image
+                        c.setPageSize((current_width, current_height))
+                        img_width, img_height = current_width, current_height
             
-            # Draw image at exact size starting from bottom-left corner (0,0)
-            c.drawImage(image_path, 0, 0, width=img_width, height=img_height)
+                    # Draw image at exact size starting from bottom-left corner (0,0)
+                    c.drawImage(image_path, 0, 0, width=img_width, height=img_height)
             
             # Start new page for next image (except for last image)
             if i < len(image_files) - 1:
                 c.showPage()
             
-            # Progress indicator
-            if (i + 1) % 10 == 0:
-                print(f"Processed {i + 1}/{len(image_files)} images...")
+            progress.advance()
                 
         except Exception as e:
-            print(f"Error processing {image_path}: {e}")
+            progress.log(f"Error processing {image_path}: {e}")
+            progress.advance(failed=1)
             continue
     
+    progress.close()
+    
     # Save PDF
     c.save()
     print(f"PDF created successfully: {output_pdf}")
     print(f"Total pages: {len(image_files)}")
     return True
 
-def create_individual_pdfs(image_folder="id_cards", output_folder="individual_pdfs"):
+def create_individual_pdfs(image_folder="id_cards", output_folder="individual_pdfs", page_size=None, dpi=DEFAULT_DPI):
     """
     Create individual PDF files for each ID card image with exact image size
     
     Args:
         image_folder (str): Folder containing ID card images
         output_folder (str): Output folder for individual PDFs
+        page_size (tuple): Physical page size in points; if set, every image is
+                           resampled to `dpi` and centered on a page of this size
+        dpi (int): Target print resolution when page_size is set
     """
     
     # Check if the image folder exists
@@ -107,6 +131,8 @@ def create_individual_pdfs(image_folder="id_cards", output_folder="individual_pd
     successful_count = 0
     failed_count = 0
     
+    progress = ProgressReporter("individual_pdfs", total=len(image_files))
+    
     for image_path in image_files:
         try:
             # Get filename without extension
@@ -114,21 +140,31 @@ def create_individual_pdfs(image_folder="id_cards", output_folder="individual_pd
             pdf_filename = os.path.join(output_folder, f"{base_name}.pdf")
             
             # Open image to get exact dimensions
-            img = Image.open(image_path)
-            img_width, img_height = img.size
+            with Image.open(image_path) as img:
+                img_width, img_height = img.size
             
-            # Create PDF with exact image size
-            c = canvas.Canvas(pdf_filename, pagesize=(img_width, img_height))
+                if page_size:
+                    # Resample once to the print resolution and center on the fixed page
+                    c = canvas.Canvas(pdf_filename, pagesize=page_size)
+                    page_img, x, y, draw_width, draw_height = fit_image_to_page(img, page_size, dpi)
+                    c.drawImage(ImageReader(page_img), x, y, width=draw_width, height=draw_height)
+                else:
+                    # Create PDF with exact image size
+                    c = canvas.Canvas(pdf_filename, pagesize=(img_width, img_height))
             
-            # Draw image at exact size
-            c.drawImage(image_path, 0, 0, width=img_width, height=img_height)
+                    # Draw image at exact size
+                    c.drawImage(image_path, 0, 0, width=img_width, height=img_height)
             c.save()
             
             successful_count += 1
+            progress.advance()
             
         except Exception as e:
-            print(f"Error creating PDF for {image_path}: {e}")
+            progress.log(f"Error creating PDF for {image_path}: {e}")
             failed_count += 1
+            progress.advance(failed=1)
+    
+    progress.close()
     
     print(f"Individual PDFs created: {successful_count} successful, {failed_count} failed")
     print(f"PDFs saved in '{output_folder}' folder")
@@ -142,16 +178,21 @@ def main():
                        help="Input folder containing images")
     parser.add_argument("--output", default="id_cards.pdf", 
                        help="Output PDF filename (for combined mode)")
+    parser.add_argument("--page-size", choices=sorted(PAGE_SIZES), default=None,
+                       help="Physical page size; images are resampled to --dpi (default: page per image pixel size)")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI,
+                       help="Target print resolution when --page-size is set")
     
     args = parser.parse_args()
+    page_size = PAGE_SIZES[args.page_size] if args.page_size else None
     
     if args.mode in ["combined", "both"]:
         print("Creating combined PDF...")
-        images_to_pdf(args.input, args.output)
+        images_to_pdf(args.input, args.output, page_size=page_size, dpi=args.dpi)
     
     if args.mode in ["individual", "both"]:
         print("Creating individual PDFs...")
-        create_individual_pdfs(args.input, "individual_pdfs")
+        create_individual_pdfs(args.input, "individual_pdfs", page_size=page_size, dpi=args.dpi)
     
     print("PDF conversion completed!")
 
@@ -1,109 +1,61 @@
-import csv
 import os
-from PIL import Image, ImageDraw, ImageFont
+import sys
+import argparse
 
-def generate_certificates():
-    # File paths
-    csv_file = 'participantlist.csv'
-    template_image = 'participant.png'
-    output_folder = 'participants_certificates'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import certificate
+from common.certificate import render_certificate
+from common.sharding import add_shard_arguments
+from common.memwatch import add_memory_arguments, monitor_from_args
+from common.template_variants import add_template_arguments
+
+# Vertical offset applied to the centered name on this template
+NAME_Y_OFFSET = -5
+
+def load_certificate_assets(template_image, font_path="./font.ttf"):
+    """Decode this script's template and font once, see common.certificate.load_certificate_assets"""
+    return certificate.load_certificate_assets(template_image, font_path, y_offset=NAME_Y_OFFSET)
+
+def generate_certificates(csv_file='participantlist.csv', template_image='participant.png',
+                          output_folder='participants_certificates', **options):
+    """Generate a certificate for every name in the CSV file, see common.certificate.generate_certificates"""
+    return certificate.generate_certificates(csv_file, template_image, output_folder, NAME_Y_OFFSET, **options)
+
+def preflight_certificates(csv_file='participantlist.csv', template_image='participant.png',
+                           output_folder='participants_certificates', **options):
+    """Validate the CSV without rendering, see common.certificate.preflight_certificates"""
+    return certificate.preflight_certificates(csv_file, template_image, output_folder, **options)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate participation certificates")
+    parser.add_argument("--export-bands", metavar="FOLDER", default=None,
+                       help="Also save each name band with its layout metadata")
+    parser.add_argument("--bands-only", action="store_true",
+                       help="Only save the name bands to --export-bands, without full certificates")
+    parser.add_argument("--preflight", action="store_true",
+                       help="Validate the CSV and measure every name without rendering")
+    add_shard_arguments(parser)
+    add_memory_arguments(parser)
+    add_template_arguments(parser)
     
-    # Create output folder if it doesn't exist
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
+    args = parser.parse_args()
+    if (args.template_variants or args.sort_by_template) and not args.template_column:
+        parser.error("--template and --sort-by-template require --template-column")
+    if args.bands_only and not args.export_bands:
+        parser.error("--bands-only requires --export-bands")
     
-    # Check if files exist
-    if not os.path.exists(csv_file):
-        print(f"Error: {csv_file} not found!")
+    if args.preflight:
+        if not preflight_certificates():
+            sys.exit(1)
         return
     
-    if not os.path.exists(template_image):
-        print(f"Error: {template_image} not found!")
-        return
-    
-    try:
-        # Load the certificate template
-        template = Image.open(template_image)
-        template_width, template_height = template.size
-        
-        # Try to load Roboto font (you may need to adjust the path and size)
-        try:
-            # Common paths for Roboto font on Linux
-            font_paths = [
-                "./font.ttf",
-            ]
-            
-            font = None
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    font = ImageFont.truetype(font_path, 60)  # Adjust size as needed
-                    break
-            
-            if font is None:
-                print("Roboto font not found, using default font")
-                font = ImageFont.load_default()
-                
-        except Exception as e:
-            print(f"Error loading font: {e}")
-            font = ImageFont.load_default()
-        
-        # Read names from CSV file
-        with open(csv_file, 'r', newline='', encoding='utf-8') as file:
-            csv_reader = csv.reader(file)
-            
-            # Skip header row if it exists
-            header = next(csv_reader, None)
-            if header and header[0].lower() in ['name']:
-                pass  # Header skipped
-            else:
-                # If first row is not a header, process it as data
-                file.seek(0)
-                csv_reader = csv.reader(file)
-            
-            certificate_count = 0
-            
-            for row in csv_reader:
-                if row and row[0].strip():  # Check if name exists and is not empty
-                    name = row[0].strip()
-                    
-                    # Create a copy of the template
-                    certificate = template.copy()
-                    draw = ImageDraw.Draw(certificate)
-                    
-                    # Get text dimensions for centering
-                    bbox = draw.textbbox((0, 0), name, font=font)
-                    text_width = bbox[2] - bbox[0]
-                    text_height = bbox[3] - bbox[1]
-                    
-                    # Calculate position to center the text
-                    # Adjust these values based on where you want the name on your certificate
-                    x = (template_width - text_width) // 2
-                    y = (template_height - text_height) // 2  # Center vertically
-                    
-                    # You might want to adjust the y position based on your certificate design
-                    # For example, if the name should be in the lower half:
-                    # y = template_height * 0.6
-                    
-                    # Draw the name on the certificate
-                    draw.text((x, y-5), name, fill='#333333', font=font)  # Adjust color as needed
-                    
-                    # Save the certificate
-                    output_filename = f"{output_folder}/certificate_{name.replace(' ', '_')}.png"
-                    certificate.save(output_filename)
-                    
-                    certificate_count += 1
-                    print(f"Generated certificate for: {name}")
-                    # break
-            
-            print(f"\nTotal certificates generated: {certificate_count}")
-            print(f"Certificates saved in: {output_folder}")
-    
-    except FileNotFoundError:
-        print(f"Error: {csv_file} not found!")
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    # Generate certificates
+    if not generate_certificates(band_folder=args.export_bands,
+                                 shard=args.shard, shard_strategy=args.shard_strategy,
+                                 memory=monitor_from_args(args), template_column=args.template_column,
+                                 template_variants=dict(args.template_variants), max_templates=args.max_templates,
+                                 sort_by_template=args.sort_by_template, bands_only=args.bands_only):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    
-    # Generate certificates
-    generate_certificates()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1 @@
+"""Helpers shared by the ID card, certificate and PDF scripts"""
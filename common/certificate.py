@@ -0,0 +1,420 @@
+import csv
+import os
+import itertools
+import json
+from PIL import Image, ImageDraw, ImageFont
+
+from common.preflight import new_report, check_records, write_report
+from common.progress import ProgressReporter
+from common.text_cache import draw_text, text_mask_cache
+from common.sharding import in_shard
+from common.memwatch import MemoryMonitor, MemoryLimitExceeded
+from common.template_variants import TemplateVariantCache, column_index, missing_templates, variant_template
+
+# Drawing into a band cut from a palette template can add the text color to
+# the band's own copy of the palette, which the template does not share, so
+# these templates are drawn with the full-size path
+PALETTE_MODES = ('P', 'PA')
+
+def load_name_font(font_path="./font.ttf"):
+    """Load the font used for names, falling back to the default font"""
+    # Try to load Roboto font (you may need to adjust the path and size)
+    try:
+        # Common paths for Roboto font on Linux
+        font_paths = [
+            font_path,
+        ]
+        
+        font = None
+        for font_path in font_paths:
+            if os.path.exists(font_path):
+                font = ImageFont.truetype(font_path, 60)  # Adjust size as needed
+                break
+        
+        if font is None:
+            print("Roboto font not found, using default font")
+            font = ImageFont.load_default()
+    
+    except Exception as e:
+        print(f"Error loading font: {e}")
+        font = ImageFont.load_default()
+    
+    return font
+
+def prepare_name_band(template, font, y_offset=0):
+    """
+    Cut the strip of the template that band rendering draws names into
+    
+    Only a horizontal strip around the vertical center ever changes between
+    certificates, so the name can be drawn into a copy of that strip instead
+    of a copy of the whole template.
+    
+    Args:
+        template (Image): Loaded certificate template
+        font (ImageFont): Font used for the name
+        y_offset (int): Offset added to the centered y position
+    
+    Returns:
+        dict: Cached band and its geometry, or None if the font
+              does not expose metrics or the template is a palette image
+              (band rendering is then skipped)
+    """
+    if not hasattr(font, 'getmetrics') or template.mode in PALETTE_MODES:
+        return None
+    
+    template_width, template_height = template.size
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    
+    # Leave a full line of slack on each side for accents and descenders
+    band_top = max(0, (template_height - line_height) // 2 + y_offset - line_height)
+    band_bottom = min(template_height, (template_height + line_height) // 2 + y_offset + line_height)
+    
+    return {
+        'size': (template_width, template_height),
+        'y_offset': y_offset,
+        'band_top': band_top,
+        'band_bottom': band_bottom,
+        'band': template.crop((0, band_top, template_width, band_bottom)),
+    }
+
+def render_name_band(layout, name, font, fill='#333333'):
+    """
+    Draw a name into a copy of the cached band
+    
+    Args:
+        layout (dict): Result of prepare_name_band
+        name (str): Name to draw
+        font (ImageFont): Font used for the name
+        fill (str): Text color
+    
+    Returns:
+        tuple: (band image, (x, y) text position on the full template), or
+               None if the text would not fit inside the band
+    """
+    template_width, template_height = layout['size']
+    band = layout['band'].copy()
+    draw = ImageDraw.Draw(band)
+    
+    # Same centering math as the full-size path, measured on the band
+    bbox = draw.textbbox((0, 0), name, font=font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    x = (template_width - text_width) // 2
+    y = (template_height - text_height) // 2 + layout['y_offset']
+    
+    # Fall back to the full-size path if the glyphs would leave the band
+    if y + bbox[1] < layout['band_top'] or y + bbox[3] > layout['band_bottom']:
+        return None
+    
+    draw_text(band, (x, y - layout['band_top']), name, font, fill)
+    return band, (x, y)
+
+def assemble_certificate(template, layout, band):
+    """Build the full certificate from the template and a rendered band"""
+    certificate = template.copy()
+    certificate.paste(band, (0, layout['band_top']))
+    return certificate
+
+def export_name_band(band_folder, file_stem, name, band, text_position, layout):
+    """Save a rendered band and its layout metadata for downstream compositing"""
+    band.save(os.path.join(band_folder, f"{file_stem}_band.png"))
+    metadata = {
+        'name': name,
+        'template_size': list(layout['size']),
+        'band_top': layout['band_top'],
+        'band_bottom': layout['band_bottom'],
+        'text_position': list(text_position),
+    }
+    with open(os.path.join(band_folder, f"{file_stem}_band.json"), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
+def load_certificate_assets(template_image, font_path="./font.ttf", cut_band=False, y_offset=0):
+    """
+    Decode the template and load the font once for many certificates
+    
+    Args:
+        template_image (str): Certificate template image
+        font_path (str): Font used for the name
+        cut_band (bool): Also cut the band used to export name bands
+        y_offset (int): Vertical offset applied to the centered name on this template
+    
+    Returns:
+        dict: 'template', 'font', 'y_offset' and 'layout' (None unless band
+              rendering is used)
+    """
+    template = Image.open(template_image)
+    template.load()
+    font = load_name_font(font_path)
+    
+    # Cut the strip names are drawn into for band rendering
+    layout = None
+    if cut_band:
+        layout = prepare_name_band(template, font, y_offset)
+        if layout is None:
+            print(f"Name bands not supported for this font or a {template.mode} template, "
+                  f"saving full certificates instead")
+    
+    return {'template': template, 'font': font, 'y_offset': y_offset, 'layout': layout}
+
+def render_certificate(assets, name, output_folder, band_folder=None, bands_only=False):
+    """
+    Draw one name on the template and save the certificate
+    
+    Args:
+        assets (dict): Result of load_certificate_assets
+        name (str): Name to draw
+        output_folder (str): Folder for the generated certificate
+        band_folder (str): If set and band rendering is used, also save the band
+        bands_only (bool): Only save the band to band_folder and skip the full
+                           certificate; names that do not fit the band still
+                           get a full certificate
+    
+    Returns:
+        str: Path of the saved certificate, or of the band with bands_only
+    """
+    template, font, layout = assets['template'], assets['font'], assets['layout']
+    template_width, template_height = template.size
+    file_stem = f"certificate_{name.replace(' ', '_')}"
+    
+    rendered = render_name_band(layout, name, font) if layout else None
+    if rendered:
+        band, text_position = rendered
+        if band_folder:
+            export_name_band(band_folder, file_stem, name, band, text_position, layout)
+            if bands_only:
+                return os.path.join(band_folder, f"{file_stem}_band.png")
+        certificate = assemble_certificate(template, layout, band)
+    else:
+        # Create a copy of the template
+        certificate = template.copy()
+        draw = ImageDraw.Draw(certificate)
+        
+        # Get text dimensions for centering
+        bbox = draw.textbbox((0, 0), name, font=font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        
+        # Calculate position to center the text
+        # Adjust these values based on where you want the name on your certificate
+        x = (template_width - text_width) // 2
+        y = (template_height - text_height) // 2  # Center vertically
+        
+        # You might want to adjust the y position based on your certificate design
+        # For example, if the name should be in the lower half:
+        # y = template_height * 0.6
+        
+        # Draw the name on the certificate
+        draw_text(certificate, (x, y + assets['y_offset']), name, font, '#333333')  # Adjust color as needed
+    
+    # Save the certificate
+    output_filename = f"{output_folder}/{file_stem}.png"
+    certificate.save(output_filename)
+    
+    # Release the pixels now instead of waiting for the garbage collector
+    certificate.close()
+    return output_filename
+
+def generate_certificates(csv_file, template_image, output_folder, y_offset=0, band_folder=None, shard=None, shard_strategy='hash', memory=None,
+                          template_column=None, template_variants=None, max_templates=4,
+                          sort_by_template=False, bands_only=False):
+    """
+    Generate a certificate for every name in the CSV file
+    
+    Args:
+        csv_file (str): CSV file with names in the first column
+        template_image (str): Certificate template image
+        output_folder (str): Folder for the generated certificates
+        y_offset (int): Vertical offset applied to the centered name on this template
+        band_folder (str): If set, also save each name band with its layout metadata
+        bands_only (bool): Only save the bands to band_folder, without full
+                           certificates (requires band_folder)
+        shard (tuple): (index, count) to only generate that shard of the rows
+        shard_strategy (str): "hash" or "range", see common.sharding.in_shard
+        memory (MemoryMonitor): Optional memory instrumentation and limit guard
+        template_column (str): Column (header name or 1-based number) whose
+                               value chooses each row's template
+        template_variants (dict): Column value -> template image; other
+                                  values use template_image
+        max_templates (int): Maximum number of decoded variants kept in memory
+        sort_by_template (bool): Process rows grouped by template variant
+    
+    Returns:
+        bool: True if every row was processed, False if the run stopped early
+    """
+    if bands_only and not band_folder:
+        print("Error: bands_only requires a band folder!")
+        return False
+    
+    memory = memory or MemoryMonitor()
+    template_variants = template_variants or {}
+    
+    # Create output folder if it doesn't exist
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    
+    # Check if files exist
+    if not os.path.exists(csv_file):
+        print(f"Error: {csv_file} not found!")
+        return False
+    
+    if not os.path.exists(template_image):
+        print(f"Error: {template_image} not found!")
+        return False
+    
+    missing = missing_templates(template_variants)
+    for path in missing:
+        print(f"Error: {path} not found!")
+    if missing:
+        return False
+    
+    try:
+        # Load each certificate template and the font once for all names,
+        # keeping the most recently used variants in memory
+        templates = TemplateVariantCache(
+            lambda path: load_certificate_assets(path, cut_band=bool(band_folder), y_offset=y_offset),
+            max_templates)
+        if band_folder:
+            os.makedirs(band_folder, exist_ok=True)
+        
+        # Read names from CSV file
+        with open(csv_file, 'r', newline='', encoding='utf-8') as file:
+            csv_reader = csv.reader(file)
+            
+            # Skip header row if it exists
+            header = next(csv_reader, None)
+            if header and header[0].lower() in ['name']:
+                pass  # Header skipped
+            else:
+                # If first row is not a header, process it as data
+                file.seek(0)
+                csv_reader = csv.reader(file)
+            
+            certificate_count = 0
+            band_count = 0
+            
+            # Count rows up front so the progress line can show an ETA and
+            # range sharding knows where each slice starts; both passes stream
+            # the file instead of keeping its rows in memory
+            header_rows = 1 if header and header[0].lower() in ['name'] else 0
+            total_rows = None
+            if shard and shard_strategy == 'range':
+                with open(csv_file, 'r', newline='', encoding='utf-8') as count_file:
+                    total_rows = sum(1 for _ in csv.reader(count_file)) - header_rows
+            with open(csv_file, 'r', newline='', encoding='utf-8') as count_file:
+                count_reader = itertools.islice(csv.reader(count_file), header_rows, None)
+                total_names = sum(1 for row_number, r in enumerate(count_reader, start=1)
+                                  if r and r[0].strip() and in_shard(shard, row_number, r[0].strip(), shard_strategy, total_rows))
+            progress = ProgressReporter("certificates", total=total_names)
+            
+            # Choose each row's template through the column-to-template mapping
+            rows = enumerate(csv_reader, start=1)
+            template_for = lambda row: template_image
+            if template_column:
+                column = column_index(header if header_rows else None, template_column)
+                if column is None:
+                    print(f"Error: Column '{template_column}' not found in {csv_file}!")
+                    return False
+                template_for = lambda row: variant_template(template_variants, row[column] if len(row) > column else '',
+                                                            template_image)
+                if sort_by_template:
+                    # sorted is stable, so the CSV order is kept within each variant
+                    rows = sorted(rows, key=lambda item: template_for(item[1]))
+            
+            memory.start_stage("render")
+            for row_number, row in rows:
+                if row and row[0].strip():  # Check if name exists and is not empty
+                    if not in_shard(shard, row_number, row[0].strip(), shard_strategy, total_rows):
+                        continue
+                    name = row[0].strip()
+                    assets = templates.get(template_for(row))
+                    saved = render_certificate(assets, name, output_folder, band_folder, bands_only)
+                    
+                    # With bands_only, names that do not fit the band still get a full certificate
+                    if bands_only and os.path.dirname(saved) == band_folder:
+                        band_count += 1
+                    else:
+                        certificate_count += 1
+                    progress.advance()
+                    memory.sample()
+                    # break
+            
+            progress.close()
+            memory.end_stage()
+            if bands_only:
+                print(f"\nTotal bands generated: {band_count}")
+                print(f"Full certificates (name did not fit the band): {certificate_count}")
+            else:
+                print(f"\nTotal certificates generated: {certificate_count}")
+            print(f"Certificates saved in: {output_folder}")
+            if band_folder:
+                print(f"Bands saved in: {band_folder}")
+            stats = text_mask_cache.stats()
+            print(f"Text mask cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+            if template_column:
+                stats = templates.stats()
+                print(f"Template variants: {stats['misses']} decoded, {stats['evictions']} evicted "
+                      f"({stats['hit_rate']:.0%} hit rate)")
+            memory.print_summary()
+            return True
+    
+    except MemoryLimitExceeded as e:
+        print(f"Stopped: {e}")
+    except FileNotFoundError:
+        print(f"Error: {csv_file} not found!")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    return False
+
+def read_name_records(csv_file):
+    """
+    Yield (row number, fields) for every data row
+    
+    The header is skipped like generate_certificates does, and rows are
+    numbered from 1 after it, matching the ID card preflight, faileddata.txt
+    and sharding.
+    """
+    with open(csv_file, 'r', newline='', encoding='utf-8') as file:
+        csv_reader = csv.reader(file)
+        header = next(csv_reader, None)
+        if header is None:
+            return
+        if not (header and header[0].lower() in ['name']):
+            # The first row is data, not a header
+            csv_reader = itertools.chain([header], csv_reader)
+        for row_number, row in enumerate(csv_reader, start=1):
+            yield row_number, {'name': row[0] if row else ''}
+
+def preflight_certificates(csv_file, template_image, output_folder, margin=50,
+                           report_file='preflight_report.txt'):
+    """
+    Validate the whole CSV and lay out every name without rendering
+    
+    Checks for empty rows, names wider than the template, characters missing
+    from the font and names that would overwrite each other's output file.
+    
+    Args:
+        csv_file (str): CSV file with names in the first column
+        template_image (str): Certificate template image (only its size is read)
+        output_folder (str): Folder the certificates would be saved in
+        margin (int): Minimum space to keep on each side of the name, in pixels
+        report_file (str): Where to write the detailed report
+    
+    Returns:
+        bool: True if no problems were found
+    """
+    for path in (csv_file, template_image):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found!")
+            return False
+    
+    # Opening the template only parses its header, no pixels are decoded
+    with Image.open(template_image) as template:
+        template_width = template.width
+    
+    font = load_name_font()
+    report = new_report(csv_file)
+    check_records(report, read_name_records(csv_file), font,
+                  max_width=template_width - 2 * margin,
+                  filename_for=lambda name: f"{output_folder}/certificate_{name.replace(' ', '_')}.png")
+    return write_report(report, report_file)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import os
+import re
+import argparse
+from collections import OrderedDict
+from reportlab.pdfgen import canvas
+from reportlab.lib.utils import ImageReader
+
+from common.print_layout import PAGE_SIZES, DEFAULT_DPI, fit_image_to_page
+
+class GroupedPdfWriter:
+    """
+    Stream rendered images into one PDF per group in a single pass
+    
+    reportlab keeps a whole document in memory until it is saved, so at most
+    `max_open` group PDFs are kept open. When another group needs a writer,
+    the least recently used one is saved; later pages for that group go to a
+    new part file (e.g. "BE.part2.pdf"). Groups whose names map to the same
+    filename (e.g. "BE Civil" and "BE/Civil") get a numbered suffix
+    ("BE_Civil-2.pdf") instead of overwriting each other.
+    
+    Args:
+        output_folder (str): Folder for the group PDFs
+        page_size (tuple): Default physical page size in points, or None to
+                           size each page to its image in pixels
+        group_page_sizes (dict): Page size per group, overriding page_size
+        dpi (int): Target print resolution for fixed page sizes
+        max_open (int): Maximum number of group PDFs open at once
+    """
+    
+    def __init__(self, output_folder, page_size=None, group_page_sizes=None, dpi=DEFAULT_DPI, max_open=8):
+        self.output_folder = output_folder
+        self.page_size = page_size
+        self.group_page_sizes = group_page_sizes or {}
+        self.dpi = dpi
+        self.max_open = max(1, max_open)
+        self.open_writers = OrderedDict()
+        self.parts = {}
+        self.filenames = {}
+        self.pages = {}
+        self.files = []
+        os.makedirs(output_folder, exist_ok=True)
+    
+    def add(self, group, img):
+        """Append an image as a new page of its group's PDF"""
+        group = group or "ungrouped"
+        writer = self.open_writers.get(group)
+        if writer is None:
+            writer = self._open(group)
+        else:
+            self.open_writers.move_to_end(group)
+        
+        page_size = self.group_page_sizes.get(group, self.page_size)
+        if page_size:
+            page_img, x, y, draw_width, draw_height = fit_image_to_page(img, page_size, self.dpi)
+            writer.setPageSize(page_size)
+            writer.drawImage(ImageReader(page_img), x, y, width=draw_width, height=draw_height)
+        else:
+            writer.setPageSize(img.size)
+            writer.drawImage(ImageReader(img), 0, 0, width=img.width, height=img.height)
+        writer.showPage()
+        self.pages[group] = self.pages.get(group, 0) + 1
+    
+    def close(self):
+        """Save every open group PDF and return the paths of all files written"""
+        while self.open_writers:
+            self._save_oldest()
+        return self.files
+    
+    def _open(self, group):
+        if len(self.open_writers) >= self.max_open:
+            self._save_oldest()
+        part = self.parts.get(group, 0) + 1
+        self.parts[group] = part
+        name = self._filename(group) + (f".part{part}" if part > 1 else "")
+        path = os.path.join(self.output_folder, f"{name}.pdf")
+        writer = canvas.Canvas(path)
+        self.open_writers[group] = writer
+        self.files.append(path)
+        return writer
+    
+    def _filename(self, group):
+        """Base filename of a group, unique among the groups of this writer"""
+        if group not in self.filenames:
+            base = _safe_filename(group)
+            # Compare case-insensitively for case-insensitive file systems
+            taken = {name.lower() for name in self.filenames.values()}
+            name, number = base, 2
+            while name.lower() in taken:
+                name, number = f"{base}-{number}", number + 1
+            self.filenames[group] = name
+        return self.filenames[group]
+    
+    def _save_oldest(self):
+        _, writer = self.open_writers.popitem(last=False)
+        writer.save()
+
+def _safe_filename(group):
+    # Dots are replaced too, so a group can never look like another group's ".partN" file
+    return re.sub(r"[^\w-]+", "_", group).strip("_") or "ungrouped"
+
+def parse_group_page_size(spec):
+    """Parse "GROUP=SIZE" (e.g. "BE=CR80") into (group, page size in points)"""
+    group, sep, size = spec.rpartition("=")
+    if not sep or not group or size not in PAGE_SIZES:
+        raise argparse.ArgumentTypeError(
+            f"expected GROUP=SIZE with SIZE one of {', '.join(sorted(PAGE_SIZES))}, got {spec!r}")
+    return group, PAGE_SIZES[size]
@@ -0,0 +1,187 @@
+import gc
+import os
+import sys
+import time
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from PIL import Image
+
+class MemoryLimitExceeded(Exception):
+    """Raised by MemoryMonitor when RSS exceeds the limit and the action is "fail\""""
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # Peak RSS is the best portable fallback (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def open_fd_count():
+    """Number of open file descriptors, or None if it cannot be determined"""
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return None
+
+def live_image_count():
+    """Number of PIL images still reachable in this process (walks the heap, so sample sparingly)"""
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Image.Image))
+
+class MemoryMonitor:
+    """
+    Opt-in memory instrumentation and limit guard for the batch loops
+    
+    With profile=True, tracemalloc records the allocation peak of every
+    stage, and periodic samples record RSS, live PIL images and open file
+    descriptors over time. The guard works with or without profiling: when
+    RSS exceeds limit_mb it either raises MemoryLimitExceeded ("fail") or
+    collects garbage and pauses before continuing ("throttle").
+    
+    Args:
+        profile (bool): Record allocation peaks and the RSS timeline
+        limit_mb (float): RSS limit in MB, or None for no limit
+        action (str): "fail" or "throttle" when the limit is exceeded
+        interval (float): Seconds between samples
+        throttle_sec (float): Pause after a garbage collection in throttle mode
+    """
+    
+    def __init__(self, profile=False, limit_mb=None, action="fail", interval=5.0, throttle_sec=1.0):
+        self.profile = profile
+        self.limit_mb = limit_mb
+        self.action = action
+        self.interval = interval
+        self.throttle_sec = throttle_sec
+        self.started = time.monotonic()
+        self.last_sample = None
+        self.stages = {}
+        self.current_stage = None
+        self.timeline = []
+        self.peak_rss_mb = 0.0
+        self.throttle_count = 0
+        if profile and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    @property
+    def enabled(self):
+        return self.profile or self.limit_mb is not None
+    
+    def start_stage(self, name):
+        """Start recording the allocation peak and RSS change of a stage"""
+        if not self.profile:
+            return
+        tracemalloc.reset_peak()
+        self.current_stage = (name, tracemalloc.get_traced_memory()[0], current_rss_mb())
+    
+    def end_stage(self):
+        """Finish the stage started by start_stage"""
+        if not self.profile or self.current_stage is None:
+            return
+        name, traced_before, rss_before = self.current_stage
+        self.current_stage = None
+        traced_after, traced_peak = tracemalloc.get_traced_memory()
+        rss_after = current_rss_mb()
+        stats = self.stages.setdefault(name, {"peak_alloc_mb": 0.0, "retained_mb": 0.0, "rss_delta_mb": 0.0})
+        stats["peak_alloc_mb"] = round(max(stats["peak_alloc_mb"], (traced_peak - traced_before) / (1024 * 1024)), 2)
+        stats["retained_mb"] = round(stats["retained_mb"] + (traced_after - traced_before) / (1024 * 1024), 2)
+        stats["rss_delta_mb"] = round(stats["rss_delta_mb"] + rss_after - rss_before, 2)
+        self.record()
+    
+    @contextmanager
+    def stage(self, name):
+        """Record the allocation peak and RSS change of a block of work"""
+        self.start_stage(name)
+        try:
+            yield
+        finally:
+            self.end_stage()
+    
+    def sample(self, force=False):
+        """Take a sample if the interval has passed, then apply the guard"""
+        if not self.enabled:
+            return
+        if not force and self.last_sample is not None and time.monotonic() - self.last_sample < self.interval:
+            return
+        self.last_sample = time.monotonic()
+        self.enforce(self.record())
+    
+    def record(self):
+        """
+        Record one sample without applying the guard
+        
+        Reporting (end_stage, summary) only records, so asking for statistics
+        can never stop or pause the run.
+        
+        Returns:
+            float: Current RSS in MB
+        """
+        now = time.monotonic()
+        rss = current_rss_mb()
+        self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        if self.profile:
+            self.timeline.append({
+                "t_sec": round(now - self.started, 1),
+                "rss_mb": round(rss, 1),
+                "live_images": live_image_count(),
+                "open_fds": open_fd_count(),
+            })
+        return rss
+    
+    def enforce(self, rss):
+        """Raise MemoryLimitExceeded or throttle if rss is over the limit"""
+        if self.limit_mb is not None and rss > self.limit_mb:
+            if self.action == "fail":
+                raise MemoryLimitExceeded(f"RSS {rss:.0f} MB exceeds the {self.limit_mb:.0f} MB limit")
+            self.throttle_count += 1
+            gc.collect()
+            time.sleep(self.throttle_sec)
+    
+    def summary(self):
+        """Memory statistics for the run report"""
+        if self.enabled:
+            self.record()
+        summary = {
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "limit_mb": self.limit_mb,
+            "limit_action": self.action if self.limit_mb is not None else None,
+            "throttled": self.throttle_count,
+        }
+        if self.profile:
+            summary["stages"] = self.stages
+            summary["timeline"] = self.timeline
+            summary["live_images"] = self.timeline[-1]["live_images"] if self.timeline else None
+            summary["open_fds"] = self.timeline[-1]["open_fds"] if self.timeline else None
+        return summary
+    
+    def print_summary(self):
+        """Print a short summary of the collected statistics"""
+        if not self.enabled:
+            return
+        summary = self.summary()
+        print(f"\nMemory: peak RSS {summary['peak_rss_mb']} MB", end="")
+        if self.limit_mb is not None:
+            print(f" (limit {self.limit_mb:.0f} MB, throttled {self.throttle_count}x)", end="")
+        print()
+        if self.profile:
+            for name, stats in self.stages.items():
+                print(f"  {name}: peak {stats['peak_alloc_mb']} MB allocated, "
+                      f"{stats['retained_mb']} MB retained, RSS {stats['rss_delta_mb']:+} MB")
+            print(f"  live PIL images: {summary['live_images']}, open files: {summary['open_fds']}")
+
+def add_memory_arguments(parser):
+    """Add --mem-profile, --mem-limit-mb and --mem-limit-action to an argument parser"""
+    parser.add_argument("--mem-profile", action="store_true",
+                       help="Record per-stage allocation peaks, RSS, live images and open files")
+    parser.add_argument("--mem-limit-mb", type=float, default=None,
+                       help="RSS limit in MB for each process")
+    parser.add_argument("--mem-limit-action", choices=["fail", "throttle"], default="fail",
+                       help="Stop, or collect garbage and pause, when the limit is exceeded")
+
+def monitor_from_args(args):
+    return MemoryMonitor(args.mem_profile, args.mem_limit_mb, args.mem_limit_action)
@@ -0,0 +1,157 @@
+import os
+import time
+
+# Codepoint that no font maps, used to capture the .notdef glyph
+_UNMAPPED_CHAR = chr(0x10FFFF)
+
+def new_report(source):
+    """Create an empty preflight report for the given input file"""
+    return {
+        'source': source,
+        'rows': 0,
+        'empty_rows': [],
+        'missing_fields': [],
+        'overflows': [],
+        'missing_glyphs': [],
+        'duplicate_filenames': [],
+        'started': time.perf_counter(),
+        'elapsed': 0.0,
+    }
+
+def missing_glyphs(font, text, glyph_cache):
+    """
+    Return the characters of text that the font cannot draw
+    
+    A character is missing when the font renders it as its .notdef box.
+    Results are cached per character in glyph_cache.
+    
+    Args:
+        font (ImageFont): Font used for the text
+        text (str): Text to check
+        glyph_cache (dict): Per-font cache of character -> bool (missing)
+    """
+    if not hasattr(font, 'getmask'):
+        return []
+    
+    if _UNMAPPED_CHAR not in glyph_cache:
+        notdef = font.getmask(_UNMAPPED_CHAR)
+        glyph_cache[_UNMAPPED_CHAR] = (notdef.size, bytes(notdef))
+    notdef_size, notdef_bytes = glyph_cache[_UNMAPPED_CHAR]
+    
+    missing = []
+    for char in text:
+        if char not in glyph_cache:
+            if char.isspace():
+                glyph_cache[char] = False
+            elif not char.isprintable():
+                glyph_cache[char] = True
+            else:
+                mask = font.getmask(char)
+                glyph_cache[char] = mask.size == notdef_size and bytes(mask) == notdef_bytes
+        if glyph_cache[char] and char not in missing:
+            missing.append(char)
+    return missing
+
+def measure_text(font, text, metrics_cache):
+    """Return the inked text width in pixels, cached per text in metrics_cache"""
+    width = metrics_cache.get(text)
+    if width is None:
+        bbox = font.getbbox(text)
+        width = bbox[2] - bbox[0]
+        metrics_cache[text] = width
+    return width
+
+def check_records(report, records, font, max_width, filename_for, required_fields=('name',)):
+    """
+    Validate and lay out records without rendering anything
+    
+    Args:
+        report (dict): Report created by new_report, updated in place
+        records (iterable): (row number, dict of field -> str) pairs
+        font (ImageFont): Font used to draw the name
+        max_width (float): Widest name that fits on the template, in pixels
+        filename_for (callable): Maps a name to its output filename
+        required_fields (tuple): Fields that must be non-empty
+    
+    Returns:
+        dict: The updated report
+    """
+    glyph_cache = {}
+    metrics_cache = {}
+    seen_filenames = {}
+    
+    for row_number, fields in records:
+        report['rows'] += 1
+        
+        if not any(value.strip() for value in fields.values()):
+            report['empty_rows'].append(row_number)
+            continue
+        
+        absent = [field for field in required_fields if not fields.get(field, '').strip()]
+        if absent:
+            report['missing_fields'].append((row_number, fields.get('name', ''), absent))
+            if 'name' in absent:
+                continue
+        
+        name = fields['name'].strip()
+        
+        width = measure_text(font, name, metrics_cache)
+        if width > max_width:
+            report['overflows'].append((row_number, name, int(width), int(max_width)))
+        
+        chars = missing_glyphs(font, name, glyph_cache)
+        if chars:
+            report['missing_glyphs'].append((row_number, name, ''.join(chars)))
+        
+        filename = filename_for(name)
+        if filename in seen_filenames:
+            report['duplicate_filenames'].append((row_number, seen_filenames[filename], filename))
+        else:
+            seen_filenames[filename] = row_number
+    
+    report['elapsed'] = time.perf_counter() - report['started']
+    return report
+
+def report_problem_count(report):
+    """Total number of problems found by a preflight pass"""
+    return (len(report['empty_rows']) + len(report['missing_fields']) + len(report['overflows'])
+            + len(report['missing_glyphs']) + len(report['duplicate_filenames']))
+
+def write_report(report, report_file="preflight_report.txt"):
+    """
+    Print a preflight summary and write the full details to a text file
+    
+    Returns:
+        bool: True if no problems were found
+    """
+    problems = report_problem_count(report)
+    
+    with open(report_file, "w", encoding="utf-8") as f:
+        f.write("PREFLIGHT REPORT\n")
+        f.write("=" * 50 + "\n\n")
+        f.write(f"Source: {report['source']}\n")
+        f.write(f"Rows checked: {report['rows']}\n")
+        f.write(f"Problems found: {problems}\n\n")
+        
+        for row_number in report['empty_rows']:
+            f.write(f"Row {row_number}: empty row\n")
+        for row_number, name, fields in report['missing_fields']:
+            f.write(f"Row {row_number}: missing {', '.join(fields)} ({name or 'no name'})\n")
+        for row_number, name, width, max_width in report['overflows']:
+            f.write(f"Row {row_number}: name too wide ({width}px > {max_width}px): {name}\n")
+        for row_number, name, chars in report['missing_glyphs']:
+            f.write(f"Row {row_number}: font has no glyph for {chars!r}: {name}\n")
+        for row_number, first_row, filename in report['duplicate_filenames']:
+            f.write(f"Row {row_number}: output file {os.path.basename(filename)} already used by row {first_row}\n")
+    
+    print(f"\nPreflight checked {report['rows']} rows in {report['elapsed']:.2f}s")
+    print(f"Empty rows: {len(report['empty_rows'])}")
+    print(f"Missing fields: {len(report['missing_fields'])}")
+    print(f"Names too wide: {len(report['overflows'])}")
+    print(f"Missing glyphs: {len(report['missing_glyphs'])}")
+    print(f"Duplicate output files: {len(report['duplicate_filenames'])}")
+    if problems:
+        print(f"{problems} problems found. Details saved to '{report_file}'")
+    else:
+        print("No problems found.")
+    return problems == 0
@@ -0,0 +1,45 @@
+from PIL import Image
+from reportlab.lib.pagesizes import A4, letter, landscape
+from reportlab.lib.units import inch, mm
+
+# Physical page sizes in points, selectable from the command line
+PAGE_SIZES = {
+    "A4": A4,
+    "A4-landscape": landscape(A4),
+    "letter": letter,
+    "letter-landscape": landscape(letter),
+    "CR80": (53.98 * mm, 85.6 * mm),
+    "CR80-landscape": (85.6 * mm, 53.98 * mm),
+}
+
+DEFAULT_DPI = 300
+
+def fit_image_to_page(img, page_size, dpi=DEFAULT_DPI):
+    """
+    Resample an image once so it prints at the target resolution on a page
+    
+    The image is scaled to fit the page without changing its aspect ratio and
+    centered. Images that already have fewer pixels than the target are not
+    upsampled.
+    
+    Args:
+        img (Image): Image to place on the page
+        page_size (tuple): Page width and height in points
+        dpi (int): Target print resolution
+    
+    Returns:
+        tuple: (resampled image, x, y, width, height) with the position and
+               drawn size in points
+    """
+    page_width, page_height = page_size
+    scale = min(page_width / img.width, page_height / img.height)
+    draw_width, draw_height = img.width * scale, img.height * scale
+    
+    # Pixel size that gives exactly `dpi` pixels per printed inch
+    target_size = (max(1, round(draw_width / inch * dpi)), max(1, round(draw_height / inch * dpi)))
+    if target_size[0] < img.width:
+        img = img.resize(target_size, Image.LANCZOS)
+    
+    x = (page_width - draw_width) / 2
+    y = (page_height - draw_height) / 2
+    return img, x, y, draw_width, draw_height
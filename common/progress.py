@@ -0,0 +1,107 @@
+import sys
+import json
+import time
+
+class ProgressReporter:
+    """
+    Low-overhead progress line for long batch loops
+    
+    Updates are throttled by time, not by row count. On a terminal a single
+    status line is rewritten in place; otherwise one JSON object per line is
+    written so overnight runs can be followed from the logs.
+    
+    Args:
+        stage (str): Name of the current stage, e.g. "id_cards" or "pdf"
+        total (int): Expected number of rows, or None if unknown
+        interval (float): Seconds between updates (default: 0.5 on a
+                          terminal, 15 when writing to a log)
+        stream (file): Where to write progress (default: stderr)
+    """
+    
+    def __init__(self, stage, total=None, interval=None, stream=None):
+        self.stream = stream or sys.stderr
+        self.is_tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.interval = interval if interval is not None else (0.5 if self.is_tty else 15.0)
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.line_open = False
+    
+    def advance(self, count=1, failed=0):
+        """Record finished rows (failed ones included in count) and report if due"""
+        self.done += count
+        self.failed += failed
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self._report(now)
+    
+    def set_stage(self, stage, total=None):
+        """Switch to a new stage, resetting the counters"""
+        self.close()
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = self.last_report = time.monotonic()
+    
+    def log(self, message):
+        """Print a message without garbling the status line"""
+        if self.line_open:
+            self.stream.write("\n")
+            self.line_open = False
+        print(message)
+    
+    def close(self):
+        """Write the final status for the current stage"""
+        self._report(time.monotonic(), final=True)
+        if self.line_open:
+            self.stream.write("\n")
+            self.line_open = False
+        self.stream.flush()
+    
+    def snapshot(self, now=None):
+        """Current progress as a dict"""
+        now = now if now is not None else time.monotonic()
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = max(0.0, (self.total - self.done) / rate)
+        return {
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "failed": self.failed,
+            "rows_per_sec": round(rate, 2),
+            "elapsed_sec": round(elapsed, 1),
+            "eta_sec": round(eta, 1) if eta is not None else None,
+        }
+    
+    def _report(self, now, final=False):
+        status = self.snapshot(now)
+        if not self.is_tty:
+            if final:
+                status["final"] = True
+            self.stream.write(json.dumps(status) + "\n")
+            self.stream.flush()
+            return
+        
+        if self.total:
+            position = f"{status['done']}/{self.total} ({status['done'] / self.total:.0%})"
+        else:
+            position = str(status['done'])
+        eta = _format_seconds(status['eta_sec']) if status['eta_sec'] is not None else "--:--"
+        line = (f"{self.stage}: {position}  {status['rows_per_sec']:.1f} rows/s  "
+                f"ETA {eta}  failed {self.failed}")
+        self.stream.write("\r" + line.ljust(79))
+        self.stream.flush()
+        self.line_open = True
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
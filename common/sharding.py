@@ -0,0 +1,61 @@
+import hashlib
+import argparse
+
+SHARD_STRATEGIES = ("hash", "range")
+
+def parse_shard(spec):
+    """
+    Parse a shard spec such as "2/4" into (index, count)
+    
+    Shards are numbered from 1, so "1/4" to "4/4" together cover every row.
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, got {spec!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}, got {spec!r}")
+    return index, count
+
+def shard_suffix(shard):
+    """Filename suffix for per-shard files, e.g. ".shard-2-of-4" (empty without sharding)"""
+    return f".shard-{shard[0]}-of-{shard[1]}" if shard else ""
+
+def shard_key(name):
+    """
+    Stable key used by the hash strategy
+    
+    Output files are named after the name with spaces replaced by "_"
+    (and upper-cased for ID cards), so the key is normalized the same way:
+    rows that would write the same output file always land on the same shard.
+    """
+    return str(name).replace(" ", "_").upper()
+
+def in_shard(shard, row_number, name, strategy="hash", total_rows=None):
+    """
+    Decide whether a row belongs to a shard
+    
+    Args:
+        shard (tuple): (index, count) from parse_shard, or None for all rows
+        row_number (int): 1-based row number in the input
+        name (str): Participant name, used by the hash strategy
+        strategy (str): "hash" for a stable hash of the name, or "range" for
+                        contiguous blocks of rows
+        total_rows (int): Number of rows in the input (required for "range")
+    """
+    if shard is None:
+        return True
+    index, count = shard
+    if strategy == "range":
+        first = (index - 1) * total_rows // count
+        last = index * total_rows // count
+        return first < row_number <= last
+    digest = hashlib.md5(shard_key(name).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count == index - 1
+
+def add_shard_arguments(parser):
+    """Add --shard and --shard-strategy to an argument parser"""
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                       help="Only process shard i of N (numbered from 1)")
+    parser.add_argument("--shard-strategy", choices=SHARD_STRATEGIES, default="hash",
+                       help="Assign rows by stable hash of the name or by contiguous row range")
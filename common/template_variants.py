@@ -0,0 +1,99 @@
+import os
+import argparse
+from collections import OrderedDict
+
+class TemplateVariantCache:
+    """
+    Bounded LRU of decoded template variants
+    
+    Each entry holds whatever the loader returns for a template path (the
+    decoded image plus its precomputed layout), so a batch that mixes
+    variants decodes each template once as long as the variants in use fit
+    in the cache. Sorting rows by variant keeps misses to one per variant
+    even when they do not.
+    
+    Args:
+        loader (callable): Called with a template path, returns its assets
+        max_entries (int): Maximum number of decoded variants kept
+    """
+    
+    def __init__(self, loader, max_entries=4):
+        self.loader = loader
+        self.max_entries = max(1, max_entries)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, template_path):
+        """Return the assets of a template, decoding it if it is not cached"""
+        assets = self.entries.get(template_path)
+        if assets is not None:
+            self.entries.move_to_end(template_path)
+            self.hits += 1
+            return assets
+        
+        self.misses += 1
+        assets = self.loader(template_path)
+        self.entries[template_path] = assets
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return assets
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+def parse_template_variant(spec):
+    """Parse "VALUE=PATH" (e.g. "BE=card_be.png") into (value, template path)"""
+    value, sep, path = spec.partition("=")
+    if not sep or not value or not path:
+        raise argparse.ArgumentTypeError(f"expected VALUE=PATH, got {spec!r}")
+    return value, path
+
+def variant_template(variants, value, default_template):
+    """Template path for a column value, falling back to the default template"""
+    return variants.get(str(value).strip(), default_template)
+
+def column_index(header, column):
+    """
+    Index of a CSV column given by header name or 1-based number
+    
+    Args:
+        header (list): Header row, or None if the file has no header
+        column (str): Column name (matched case-insensitively) or number
+    
+    Returns:
+        int: 0-based column index, or None if the column does not exist
+    """
+    if header:
+        names = [name.strip().lower() for name in header]
+        if column.strip().lower() in names:
+            return names.index(column.strip().lower())
+    if column.isdigit() and int(column) >= 1:
+        return int(column) - 1
+    return None
+
+def missing_templates(variants):
+    """Mapped template files that do not exist"""
+    return sorted({path for path in variants.values() if not os.path.exists(path)})
+
+def add_template_arguments(parser):
+    """Add --template-column, --template, --max-templates and --sort-by-template to an argument parser"""
+    parser.add_argument("--template-column", metavar="COLUMN", default=None,
+                       help="Choose each row's template by the value of this column, e.g. Faculty")
+    parser.add_argument("--template", dest="template_variants", action="append", type=parse_template_variant,
+                       default=[], metavar="VALUE=PATH",
+                       help="Template for one value of --template-column, e.g. BE=card_be.png (can be repeated); "
+                            "other values use the default template")
+    parser.add_argument("--max-templates", type=int, default=4,
+                       help="Maximum number of decoded template variants kept in memory")
+    parser.add_argument("--sort-by-template", action="store_true",
+                       help="Process rows grouped by template variant so each variant is decoded once")
@@ -0,0 +1,110 @@
+import math
+import hashlib
+from collections import OrderedDict
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+class TextMaskCache:
+    """
+    Bounded LRU cache of rasterized text masks
+    
+    Masks are keyed by font file contents, font size, text and sub-pixel start
+    offset, so the same name drawn with the same font on different templates
+    is rasterized only once per process. Compositing the cached mask with
+    Image.paste uses the same fill routine as ImageDraw.text, so the output
+    is pixel-identical.
+    
+    Args:
+        max_entries (int): Maximum number of cached masks
+        max_bytes (int): Maximum total size of the cached masks
+    """
+    
+    def __init__(self, max_entries=2048, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.masks = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.font_digests = {}
+    
+    def font_key(self, font):
+        """Identify a font by file contents and size, or None if it cannot be cached"""
+        path = getattr(font, 'path', None)
+        if not isinstance(font, ImageFont.FreeTypeFont) or not isinstance(path, str):
+            return None
+        digest = self.font_digests.get(path)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            self.font_digests[path] = digest
+        return (digest, font.size)
+    
+    def get_mask(self, font, text, mode, start=(0.0, 0.0)):
+        """
+        Return (mask image, offset) for text, rasterizing it on a cache miss
+        
+        Returns None if the font cannot be cached.
+        """
+        font_key = self.font_key(font)
+        if font_key is None:
+            return None
+        
+        key = (font_key, mode, text, start)
+        entry = self.masks.get(key)
+        if entry is not None:
+            self.masks.move_to_end(key)
+            self.hits += 1
+            return entry
+        
+        self.misses += 1
+        core, offset = font.getmask2(text, mode, start=start)
+        mask = Image.frombytes(core.mode, core.size, bytes(core)) if core.size[0] and core.size[1] else None
+        entry = (mask, offset)
+        self.masks[key] = entry
+        self.bytes += len(text) + (mask.width * mask.height if mask else 0)
+        
+        while self.masks and (len(self.masks) > self.max_entries or self.bytes > self.max_bytes):
+            (_, _, old_text, _), (old_mask, _) = self.masks.popitem(last=False)
+            self.bytes -= len(old_text) + (old_mask.width * old_mask.height if old_mask else 0)
+            self.evictions += 1
+        return entry
+    
+    def stats(self):
+        """Cache statistics as a dict"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.masks),
+            'bytes': self.bytes,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+# Shared by every generator imported into the same process
+text_mask_cache = TextMaskCache()
+
+def draw_text(image, xy, text, font, fill, cache=None):
+    """
+    Draw single-line text like ImageDraw.Draw(image).text(xy, text, fill, font)
+    
+    The glyphs are rasterized through the text mask cache; fonts that cannot
+    be cached and multi-line text fall back to ImageDraw.
+    """
+    cache = cache or text_mask_cache
+    start = (math.modf(xy[0])[0], math.modf(xy[1])[0])
+    entry = None
+    if image.mode in ("L", "LA", "RGB", "RGBA") and "\n" not in text:
+        entry = cache.get_mask(font, text, "L", start)
+    if entry is None:
+        ImageDraw.Draw(image).text(xy, text, fill=fill, font=font)
+        return
+    
+    mask, offset = entry
+    if mask is None:
+        return  # Nothing to draw, e.g. only spaces
+    x = int(xy[0]) + offset[0]
+    y = int(xy[1]) + offset[1]
+    ink = ImageColor.getcolor(fill, image.mode) if isinstance(fill, str) else fill
+    image.paste(ink, (x, y, x + mask.width, y + mask.height), mask)
@@ -0,0 +1,194 @@
+import os
+import re
+import sys
+import json
+import glob
+import shutil
+import filecmp
+import argparse
+import importlib.util
+
+from common.print_layout import PAGE_SIZES, DEFAULT_DPI
+from run_event import REPO_ROOT, DOCUMENT_TYPES
+
+# Image folders produced by the generators, in the order they are merged
+IMAGE_FOLDERS = [doc["output"] for doc in DOCUMENT_TYPES.values()]
+
+FAILED_RECORD_FIELDS = ("Row", "Name", "Email", "Faculty", "Reason")
+
+def merge_images(shard_dirs, output_dir):
+    """
+    Copy every shard's images into one folder per document type
+    
+    Returns:
+        tuple: ({folder: number of images}, list of conflicting filenames)
+    """
+    counts = {}
+    conflicts = []
+    for folder in IMAGE_FOLDERS:
+        sources = [os.path.join(shard_dir, folder) for shard_dir in shard_dirs]
+        sources = [source for source in sources if os.path.isdir(source)]
+        if not sources:
+            continue
+        
+        target = os.path.join(output_dir, folder)
+        os.makedirs(target, exist_ok=True)
+        counts[folder] = 0
+        for source in sources:
+            for image_path in sorted(glob.glob(os.path.join(source, "*.png"))):
+                destination = os.path.join(target, os.path.basename(image_path))
+                if os.path.exists(destination):
+                    # The same file from two shards is only a problem if it differs
+                    if not filecmp.cmp(image_path, destination, shallow=False):
+                        conflicts.append(os.path.join(folder, os.path.basename(image_path)))
+                    continue
+                shutil.copy2(image_path, destination)
+                counts[folder] += 1
+    return counts, conflicts
+
+def read_failed_records(path):
+    """Parse a faileddata.txt written by ID_Cards/main.py into a list of dicts"""
+    with open(path, "r") as f:
+        text = f.read()
+    records = []
+    for block in re.split(r"^-{30}$", text, flags=re.MULTILINE):
+        record = {}
+        for line in block.splitlines():
+            key, _, value = line.partition(": ")
+            if key in FAILED_RECORD_FIELDS:
+                record[key] = value
+        if "Row" in record:
+            records.append(record)
+    return records
+
+def merge_failed_records(shard_dirs, output_dir):
+    """Combine every shard's failure log into one log ordered by row"""
+    records = []
+    for shard_dir in shard_dirs:
+        for path in sorted(glob.glob(os.path.join(shard_dir, "faileddata*.txt"))):
+            records.extend(read_failed_records(path))
+    if not records:
+        return 0
+    
+    records.sort(key=lambda record: int(record["Row"]))
+    with open(os.path.join(output_dir, "faileddata.txt"), "w") as f:
+        f.write("FAILED ID CARD CREATION RECORDS\n")
+        f.write("=" * 50 + "\n\n")
+        for record in records:
+            for field in FAILED_RECORD_FIELDS:
+                f.write(f"{field}: {record.get(field, '')}\n")
+            f.write("-" * 30 + "\n")
+    return len(records)
+
+def merge_run_reports(shard_dirs, output_dir):
+    """Combine the run_event.py reports of every shard into one report"""
+    reports = []
+    for shard_dir in shard_dirs:
+        for path in sorted(glob.glob(os.path.join(shard_dir, "run_report*.json"))):
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+    if not reports:
+        return None
+    
+    counts = {}
+    for report in reports:
+        for doc_type, count in report["counts"].items():
+            merged = counts.setdefault(doc_type, {"created": 0, "failed": 0})
+            merged["created"] += count["created"]
+            merged["failed"] += count["failed"]
+    
+    merged_report = {
+        "source": reports[0]["source"],
+        "documents": reports[0]["documents"],
+        "shards": [report.get("shard") for report in reports],
+        "rows": sum(report["rows"] for report in reports),
+        "elapsed_sec": max(report["elapsed_sec"] for report in reports),
+        "counts": counts,
+        "stopped": [report["stopped"] for report in reports if report.get("stopped")] or None,
+        "memory": [report.get("memory") for report in reports] if any(report.get("memory") for report in reports) else None,
+        "failures": sorted((failure for report in reports for failure in report["failures"]),
+                           key=lambda failure: (failure["row"], failure["document"])),
+    }
+    with open(os.path.join(output_dir, "run_report.json"), "w", encoding="utf-8") as f:
+        json.dump(merged_report, f, indent=2, ensure_ascii=False)
+    return merged_report
+
+def build_pdfs(output_dir, folders, page_sizes=None, dpi=DEFAULT_DPI):
+    """
+    Build one combined PDF per merged image folder, in the same order as an unsharded run
+    
+    Args:
+        output_dir (str): Folder holding the merged image folders
+        folders (list): Image folders to convert
+        page_sizes (dict): Page size in points per image folder; folders without
+                           one get pages the size of their images
+        dpi (int): Target print resolution for fixed page sizes
+    """
+    page_sizes = page_sizes or {}
+    spec = importlib.util.spec_from_file_location("merge_pdf_converter",
+                                                  os.path.join(REPO_ROOT, "ID_Cards", "pdfConverter.py"))
+    converter = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(converter)
+    for folder in folders:
+        converter.images_to_pdf(os.path.join(output_dir, folder), os.path.join(output_dir, f"{folder}.pdf"),
+                                page_size=page_sizes.get(folder), dpi=dpi)
+
+def parse_document_page_size(spec):
+    """Parse "DOC=SIZE" (e.g. "id_card=CR80") into (image folder, page size in points)"""
+    doc_type, sep, size = spec.rpartition("=")
+    if not sep or doc_type not in DOCUMENT_TYPES or size not in PAGE_SIZES:
+        raise argparse.ArgumentTypeError(
+            f"expected DOC=SIZE with DOC one of {', '.join(DOCUMENT_TYPES)} and SIZE one of "
+            f"{', '.join(sorted(PAGE_SIZES))}, got {spec!r}")
+    return DOCUMENT_TYPES[doc_type]["output"], PAGE_SIZES[size]
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the outputs of sharded runs into one result")
+    parser.add_argument("shard_dirs", nargs="+",
+                       help="Folders holding each shard's outputs (image folders, faileddata*.txt, run_report*.json)")
+    parser.add_argument("--output", required=True, help="Folder for the merged result")
+    parser.add_argument("--pdf", action="store_true",
+                       help="Also build one combined PDF per document type from the merged images")
+    parser.add_argument("--page-size", type=parse_document_page_size, action="append", default=[],
+                       metavar="DOC=SIZE",
+                       help="Physical page size for one document type's --pdf, e.g. id_card=CR80 or "
+                            "git=A4-landscape (repeatable); images are resampled to --dpi")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI,
+                       help="Target print resolution for documents with a --page-size")
+    
+    args = parser.parse_args()
+    missing = [shard_dir for shard_dir in args.shard_dirs if not os.path.isdir(shard_dir)]
+    if missing:
+        parser.error(f"shard folder(s) not found: {', '.join(missing)}")
+    os.makedirs(args.output, exist_ok=True)
+    
+    image_counts, conflicts = merge_images(args.shard_dirs, args.output)
+    failed_count = merge_failed_records(args.shard_dirs, args.output)
+    report = merge_run_reports(args.shard_dirs, args.output)
+    
+    print(f"Merged {len(args.shard_dirs)} shards into '{args.output}'")
+    for folder, count in image_counts.items():
+        print(f"{folder}: {count} images")
+    if failed_count:
+        print(f"Failed records: {failed_count} (see faileddata.txt)")
+    if report:
+        print(f"Run reports merged: {len(report['shards'])}")
+    
+    # Per-group PDFs are bound to each shard's own rows and are not combined
+    group_pdf_shards = [shard_dir for shard_dir in args.shard_dirs
+                        if glob.glob(os.path.join(shard_dir, "group_pdfs", "*.pdf"))]
+    if group_pdf_shards:
+        print(f"Note: group_pdfs/ in {', '.join(group_pdf_shards)} were not merged; "
+              f"run ID_Cards/main.py --group-by on the full CSV for combined group PDFs")
+    
+    if args.pdf:
+        build_pdfs(args.output, list(image_counts), dict(args.page_size), args.dpi)
+    
+    if conflicts:
+        print(f"\n{len(conflicts)} files differ between shards and were not overwritten:")
+        for conflict in conflicts:
+            print(f"  {conflict}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+import os
+import io
+import sys
+import csv
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import contextlib
+import importlib.util
+from PIL import Image, ImageChops
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, REPO_ROOT)
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "fixtures.csv")
+GOLDEN_FOLDER = os.path.join(HERE, "golden")
+MANIFEST = os.path.join(GOLDEN_FOLDER, "manifest.json")
+
+def load_script(folder, script):
+    """Import one of the generator scripts by path"""
+    path = os.path.join(REPO_ROOT, folder, script)
+    name = f"golden_{folder}_{os.path.splitext(script)[0]}".replace('&', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def render_id_cards(module, rows, options):
+    """Render the fixture rows with create_id_card, returns the output folder"""
+    for row in rows:
+        module.create_id_card(row['name'], row['email'], row['faculty'])
+    return "id_cards"
+
+def render_id_cards_with_assets(module, rows, options):
+    """Render with the template and font loaded once, as ID_Cards/main.py does"""
+    assets = module.load_card_assets()
+    for row in rows:
+        module.create_id_card(row['name'], row['email'], row['faculty'], assets=assets)
+    return "id_cards"
+
+def render_id_cards_with_variants(module, rows, options):
+    """
+    Render through a one-entry TemplateVariantCache with one template per faculty
+    
+    Every faculty maps to an identical copy of card.png, so the output must
+    match the plain golden images while the cache misses and evicts on each
+    change of faculty.
+    """
+    from common.template_variants import TemplateVariantCache, variant_template
+    variants = {}
+    for number, faculty in enumerate(sorted({row['faculty'] for row in rows}), start=1):
+        variants[faculty] = f"card_variant_{number}.png"
+        shutil.copy("card.png", variants[faculty])
+    templates = TemplateVariantCache(module.load_card_assets, max_entries=1)
+    for row in rows:
+        assets = templates.get(variant_template(variants, row['faculty'], "card.png"))
+        module.create_id_card(row['name'], row['email'], row['faculty'], assets=assets)
+    return "id_cards"
+
+def render_run_event(module, rows, options):
+    """
+    Render every document for the fixture rows in one pass with run_event.render_rows
+    
+    Both documents are rendered by the same process, sharing the text mask
+    cache, exactly as a run_event.py worker does; only options['output']
+    is compared.
+    """
+    output_folders = {"id_card": "event_id_cards", "git": "event_certificates"}
+    for folder in output_folders.values():
+        os.makedirs(folder, exist_ok=True)
+    module.init_worker(list(output_folders))
+    records = [(number, row) for number, row in enumerate(rows, start=1)]
+    _, _, _, results, _ = module.render_rows(records, output_folders)
+    errors = [f"row {row_number} {doc_type}: {error}" for row_number, doc_type, _, error in results if error]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    return output_folders[options['output']]
+
+def render_certificates(module, rows, options):
+    """Render the fixture rows with generate_certificates, returns the output folder"""
+    with open("names.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "faculty"])
+        for row in rows:
+            writer.writerow([row['name'], row['faculty']])
+    kwargs = dict(options.get('kwargs', {}))
+    if options.get('variants'):
+        # Map every faculty to an identical copy of the template, see render_id_cards_with_variants
+        kwargs['template_variants'] = {}
+        for number, faculty in enumerate(sorted({row['faculty'] for row in rows}), start=1):
+            kwargs['template_variants'][faculty] = f"variant_{number}_{options['template']}"
+            shutil.copy(options['template'], kwargs['template_variants'][faculty])
+        kwargs.update(template_column="faculty", max_templates=1)
+    if not module.generate_certificates(csv_file="names.csv", template_image=options['template'],
+                                        output_folder="out", **kwargs):
+        raise RuntimeError("generate_certificates stopped early")
+    return "out"
+
+def render_certificate_bands(module, rows, options):
+    """Render bands only, then paste each band into the template as downstream compositing would"""
+    render_certificates(module, rows, dict(options, kwargs={"band_folder": "bands", "bands_only": True}))
+    os.makedirs("composited", exist_ok=True)
+    with Image.open(options['template']) as template:
+        template.load()
+        for filename in sorted(os.listdir("bands")):
+            if not filename.endswith("_band.json"):
+                continue
+            with open(os.path.join("bands", filename), "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            stem = filename[:-len("_band.json")]
+            certificate = template.copy()
+            with Image.open(os.path.join("bands", f"{stem}_band.png")) as band:
+                certificate.paste(band, (0, metadata['band_top']))
+            certificate.save(os.path.join("composited", f"{stem}.png"))
+    return "composited"
+
+# Each entry renders the fixtures through one code path; variants of the same
+# document share its golden images
+DOCUMENTS = {
+    "id_card": {
+        "folder": "ID_Cards", "script": "main.py", "assets": ["card.png", "font.otf"],
+        "render": render_id_cards,
+    },
+    "id_card_assets": {
+        "folder": "ID_Cards", "script": "main.py", "assets": ["card.png", "font.otf"],
+        "render": render_id_cards_with_assets, "golden": "id_card",
+    },
+    "id_card_variants": {
+        "folder": "ID_Cards", "script": "main.py", "assets": ["card.png", "font.otf"],
+        "render": render_id_cards_with_variants, "golden": "id_card",
+    },
+    "id_card_run_event": {
+        "folder": "", "script": "run_event.py",
+        "assets": ["ID_Cards/card.png", "ID_Cards/font.otf", "Git&GithubCertificate/certificate.png",
+                   "Git&GithubCertificate/font.ttf"],
+        "render": render_run_event, "output": "id_card", "golden": "id_card",
+    },
+    "git_certificate": {
+        "folder": "Git&GithubCertificate", "script": "main.py", "assets": ["certificate.png", "font.ttf"],
+        "render": render_certificates, "template": "certificate.png",
+    },
+    "git_certificate_band": {
+        "folder": "Git&GithubCertificate", "script": "main.py", "assets": ["certificate.png", "font.ttf"],
+        "render": render_certificates, "template": "certificate.png", "golden": "git_certificate",
+        "kwargs": {"band_folder": "bands"},
+    },
+    "git_certificate_variants": {
+        "folder": "Git&GithubCertificate", "script": "main.py", "assets": ["certificate.png", "font.ttf"],
+        "render": render_certificates, "template": "certificate.png", "golden": "git_certificate",
+        "variants": True,
+    },
+    "git_certificate_run_event": {
+        "folder": "", "script": "run_event.py",
+        "assets": ["ID_Cards/card.png", "ID_Cards/font.otf", "Git&GithubCertificate/certificate.png",
+                   "Git&GithubCertificate/font.ttf"],
+        "render": render_run_event, "output": "git", "golden": "git_certificate",
+    },
+    "git_certificate_bands_only": {
+        "folder": "Git&GithubCertificate", "script": "main.py", "assets": ["certificate.png", "font.ttf"],
+        "render": render_certificate_bands, "template": "certificate.png", "golden": "git_certificate",
+    },
+    # Palette templates cannot be band rendered and must fall back to the full-size path
+    "git_certificate_palette": {
+        "folder": "Git&GithubCertificate", "script": "main.py", "assets": ["certificate.png", "font.ttf"],
+        "render": render_certificates, "template": "certificate.png", "template_mode": "P",
+    },
+    "git_certificate_palette_band": {
+        "folder": "Git&GithubCertificate", "script": "main.py", "assets": ["certificate.png", "font.ttf"],
+        "render": render_certificates, "template": "certificate.png", "template_mode": "P",
+        "golden": "git_certificate_palette", "kwargs": {"band_folder": "bands"},
+    },
+    # participant.png is not tracked, so the Git & GitHub template stands in
+    # for it; this still pins the participation script's own NAME_Y_OFFSET
+    "participation_certificate": {
+        "folder": "ParticipationCertificate", "script": "main.py", "assets": ["font.ttf"],
+        "stand_ins": {"participant.png": "Git&GithubCertificate/certificate.png"},
+        "render": render_certificates, "template": "participant.png",
+    },
+    "participation_certificate_band": {
+        "folder": "ParticipationCertificate", "script": "main.py", "assets": ["font.ttf"],
+        "stand_ins": {"participant.png": "Git&GithubCertificate/certificate.png"},
+        "render": render_certificates, "template": "participant.png", "golden": "participation_certificate",
+        "kwargs": {"band_folder": "bands"},
+    },
+}
+
+def pixel_hash(img):
+    """Hash of the decoded pixels, independent of how the PNG was compressed"""
+    digest = hashlib.sha256()
+    digest.update(f"{img.mode}:{img.width}x{img.height}:".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+def compare_images(actual, expected, tolerance, max_diff_ratio):
+    """
+    Compare two images pixel by pixel
+    
+    Args:
+        actual (Image): Freshly rendered image
+        expected (Image): Golden image
+        tolerance (int): Largest per-channel difference treated as equal
+        max_diff_ratio (float): Fraction of pixels allowed to exceed the tolerance
+    
+    Returns:
+        tuple: (passed, message)
+    """
+    if actual.size != expected.size or actual.mode != expected.mode:
+        return False, f"size/mode {actual.size} {actual.mode} != golden {expected.size} {expected.mode}"
+    
+    diff = ImageChops.difference(actual, expected)
+    bbox = diff.getbbox(alpha_only=False)
+    if bbox is None:
+        return True, "identical pixels"
+    
+    # A pixel differs when any of its channels is off by more than the tolerance
+    channel_masks = [band.point(lambda v: 255 if v > tolerance else 0) for band in diff.split()]
+    mask = channel_masks[0]
+    for channel_mask in channel_masks[1:]:
+        mask = ImageChops.lighter(mask, channel_mask)
+    differing = mask.histogram()[255]
+    ratio = differing / (actual.width * actual.height)
+    message = f"{differing} pixels differ beyond tolerance {tolerance} ({ratio:.4%}) within {bbox}"
+    return ratio <= max_diff_ratio, message
+
+def read_fixtures(limit=None):
+    with open(FIXTURES, "r", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return rows[:limit] if limit else rows
+
+def render_document(key, rows):
+    """
+    Render the fixture rows for one document in a scratch folder
+    
+    Returns:
+        tuple: (scratch folder, {filename: Image}, seconds per row), or None
+               if the document's assets are not available
+    """
+    doc = DOCUMENTS[key]
+    asset_folder = os.path.join(REPO_ROOT, doc["folder"])
+    stand_ins = doc.get("stand_ins", {})
+    missing = [a for a in doc["assets"] if not os.path.exists(os.path.join(asset_folder, a))]
+    missing += [s for s in stand_ins.values() if not os.path.exists(os.path.join(REPO_ROOT, s))]
+    if missing:
+        print(f"[skip] {key}: missing {', '.join(missing)}")
+        return None
+    
+    workdir = tempfile.mkdtemp(prefix=f"golden_{key}_")
+    for asset in doc["assets"]:
+        shutil.copy(os.path.join(asset_folder, asset), workdir)
+    for name, source in stand_ins.items():
+        shutil.copy(os.path.join(REPO_ROOT, source), os.path.join(workdir, name))
+    if "template_mode" in doc:
+        # Convert with the fixed web palette and no dithering so the result
+        # does not depend on the quantizer
+        template_path = os.path.join(workdir, doc["template"])
+        with Image.open(template_path) as template:
+            converted = template.convert("RGB").convert(doc["template_mode"], dither=Image.Dither.NONE)
+        converted.save(template_path)
+    
+    module = load_script(doc["folder"], doc["script"])
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            output_folder = doc["render"](module, rows, doc)
+        elapsed = time.perf_counter() - start
+        images = {}
+        for filename in sorted(os.listdir(output_folder)):
+            with Image.open(os.path.join(output_folder, filename)) as img:
+                img.load()
+                images[filename] = img.copy()
+    finally:
+        os.chdir(previous)
+    
+    return workdir, images, elapsed / max(1, len(rows))
+
+def record(keys, rows):
+    """Render the fixtures and store the results as the new golden images"""
+    manifest = {}
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    
+    for key in keys:
+        if "golden" in DOCUMENTS[key]:
+            continue  # Variants are checked against their base document
+        rendered = render_document(key, rows)
+        if rendered is None:
+            continue
+        workdir, images, per_row = rendered
+        folder = os.path.join(GOLDEN_FOLDER, key)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        manifest[key] = {}
+        for filename, img in images.items():
+            img.save(os.path.join(folder, filename), optimize=True)
+            manifest[key][filename] = pixel_hash(img)
+        shutil.rmtree(workdir, ignore_errors=True)
+        print(f"[record] {key}: {len(images)} images ({per_row * 1000:.1f} ms/row)")
+    
+    os.makedirs(GOLDEN_FOLDER, exist_ok=True)
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
+def check(keys, rows, tolerance, max_diff_ratio, diff_folder):
+    """
+    Render the fixtures and compare them against the golden images
+    
+    Returns:
+        tuple: (True if every rendered image matches its golden image,
+               list of the documents that were skipped)
+    """
+    with open(MANIFEST, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    
+    all_passed = True
+    checked = 0
+    skipped = []
+    for key in keys:
+        golden_key = DOCUMENTS[key].get("golden", key)
+        if golden_key not in manifest:
+            print(f"[skip] {key}: no golden images recorded")
+            skipped.append(key)
+            continue
+        rendered = render_document(key, rows)
+        if rendered is None:
+            skipped.append(key)
+            continue
+        checked += 1
+        workdir, images, per_row = rendered
+        expected_files = manifest[golden_key]
+        failures = []
+        
+        for filename in sorted(set(expected_files) - set(images)):
+            failures.append(f"{filename}: not rendered")
+        for filename in sorted(set(images) - set(expected_files)):
+            failures.append(f"{filename}: not in golden set")
+        
+        for filename in sorted(set(images) & set(expected_files)):
+            actual = images[filename]
+            # Fast path: identical pixel hash means identical output
+            if pixel_hash(actual) == expected_files[filename]:
+                continue
+            with Image.open(os.path.join(GOLDEN_FOLDER, golden_key, filename)) as expected:
+                expected.load()
+                passed, message = compare_images(actual, expected, tolerance, max_diff_ratio)
+                if not passed and diff_folder and actual.size == expected.size and actual.mode == expected.mode:
+                    os.makedirs(diff_folder, exist_ok=True)
+                    ImageChops.difference(actual, expected).save(os.path.join(diff_folder, f"{key}_{filename}"))
+            if not passed:
+                failures.append(f"{filename}: {message}")
+            else:
+                print(f"[near] {key}/{filename}: {message}")
+        
+        shutil.rmtree(workdir, ignore_errors=True)
+        status = "FAIL" if failures else "ok"
+        print(f"[{status}] {key}: {len(images)} images ({per_row * 1000:.1f} ms/row)")
+        for failure in failures:
+            print(f"    {failure}")
+        all_passed = all_passed and not failures
+    
+    print(f"\n{checked} checked, {len(skipped)} skipped" + (f" ({', '.join(skipped)})" if skipped else ""))
+    return all_passed, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare generator output against stored golden images")
+    parser.add_argument("command", nargs="?", choices=["check", "record"], default="check",
+                       help="check against the golden images, or record new ones")
+    parser.add_argument("--only", action="append", choices=sorted(DOCUMENTS),
+                       help="Restrict to one document (can be repeated)")
+    parser.add_argument("--tolerance", type=int, default=0,
+                       help="Largest per-channel difference treated as equal (default: 0)")
+    parser.add_argument("--max-diff-ratio", type=float, default=0.0,
+                       help="Fraction of pixels allowed to exceed the tolerance (default: 0)")
+    parser.add_argument("--diff-folder", default=None,
+                       help="Save difference images for failing comparisons here")
+    parser.add_argument("--fail-on-skip", action="store_true",
+                       help="Also exit non-zero if any document was skipped")
+    
+    args = parser.parse_args()
+    keys = args.only or list(DOCUMENTS)
+    rows = read_fixtures()
+    
+    if args.command == "record":
+        record(keys, rows)
+        return
+    
+    passed, skipped = check(keys, rows, args.tolerance, args.max_diff_ratio, args.diff_folder)
+    if not passed or (skipped and args.fail_on_skip):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
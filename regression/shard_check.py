@@ -0,0 +1,49 @@
+import os
+import sys
+import itertools
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.sharding import in_shard
+
+# Names that differ but are written to the same file by at least one generator
+COLLIDING_NAMES = [
+    ["John Doe", "John_Doe", "john doe", "JOHN_DOE"],
+    ["Ägnès Jùqy-Þórðar", "ägnès_jùqy-þórðar"],
+    ["Mary Ann Lee", "Mary_Ann Lee", "Mary Ann_Lee"],
+]
+
+def certificate_file(name):
+    return f"certificate_{name.replace(' ', '_')}.png"
+
+def id_card_file(name):
+    return f"{name.upper().replace(' ', '_')}_id_card.png"
+
+def check(max_shards=8):
+    """
+    Check that names writing the same output file always land on the same shard
+    
+    Returns:
+        list: Descriptions of every pair that was split across shards
+    """
+    problems = []
+    for group in COLLIDING_NAMES:
+        for first, second in itertools.combinations(group, 2):
+            if certificate_file(first) != certificate_file(second) and id_card_file(first) != id_card_file(second):
+                continue
+            for count in range(2, max_shards + 1):
+                shards = [next(index for index in range(1, count + 1) if in_shard((index, count), 1, name))
+                          for name in (first, second)]
+                if shards[0] != shards[1]:
+                    problems.append(f"{first!r} -> {shards[0]}/{count}, {second!r} -> {shards[1]}/{count}")
+    return problems
+
+def main():
+    problems = check()
+    for problem in problems:
+        print(f"[FAIL] {problem}")
+    if problems:
+        sys.exit(1)
+    print("[ok] names that share an output file share a shard")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import time
+import argparse
+import importlib.util
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from common.progress import ProgressReporter
+from common.text_cache import text_mask_cache
+from common.sharding import add_shard_arguments, in_shard, shard_suffix
+from common.memwatch import MemoryMonitor, MemoryLimitExceeded, add_memory_arguments
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Every document type the runner can produce, with the script that renders it
+# and the template and font it needs
+DOCUMENT_TYPES = {
+    "id_card": {
+        "folder": "ID_Cards", "template": "card.png", "font": "font.otf",
+        "output": "id_cards",
+    },
+    "participation": {
+        "folder": "ParticipationCertificate", "template": "participant.png", "font": "font.ttf",
+        "output": "participants_certificates",
+    },
+    "git": {
+        "folder": "Git&GithubCertificate", "template": "certificate.png", "font": "font.ttf",
+        "output": "generated_certificates",
+    },
+}
+
+# Per-worker state: document type -> (script module, preloaded assets)
+_worker_documents = {}
+_worker_memory = MemoryMonitor()
+
+def load_script(doc_type):
+    """Import the main.py of a document type by path"""
+    folder = DOCUMENT_TYPES[doc_type]["folder"]
+    spec = importlib.util.spec_from_file_location(f"event_{doc_type}", os.path.join(REPO_ROOT, folder, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def asset_path(doc_type, key):
+    doc = DOCUMENT_TYPES[doc_type]
+    return os.path.join(REPO_ROOT, doc["folder"], doc[key])
+
+def init_worker(doc_types, memory_options=None):
+    """Load every requested template and font once in this worker"""
+    global _worker_memory
+    if memory_options:
+        _worker_memory = MemoryMonitor(**memory_options)
+    for doc_type in doc_types:
+        module = load_script(doc_type)
+        template, font = asset_path(doc_type, "template"), asset_path(doc_type, "font")
+        if doc_type == "id_card":
+            assets = module.load_card_assets(template, font)
+        else:
+            assets = module.load_certificate_assets(template, font)
+        _worker_documents[doc_type] = (module, assets)
+
+def render_rows(rows, output_folders):
+    """
+    Render every requested document for a chunk of rows
+    
+    Args:
+        rows (list): (row number, fields) pairs
+        output_folders (dict): Document type -> output folder
+    
+    Returns:
+        tuple: (worker pid, text mask cache stats, memory summary or None, list
+               of (row number, document type, name, error or None) per document,
+               reason the memory guard stopped the chunk or None)
+    """
+    results = []
+    stopped = None
+    _worker_memory.start_stage("render")
+    for row_number, fields in rows:
+        name = fields['name'].strip()
+        email = fields['email'].strip()
+        for doc_type, output_folder in output_folders.items():
+            module, assets = _worker_documents[doc_type]
+            try:
+                if doc_type == "id_card":
+                    if not (name and email):
+                        raise ValueError("Missing name or email")
+                    module.create_id_card(name, email, fields['faculty'], assets=assets, output_folder=output_folder)
+                else:
+                    if not name:
+                        raise ValueError("Missing name")
+                    module.render_certificate(assets, name, output_folder)
+                results.append((row_number, doc_type, name, None))
+            except Exception as e:
+                results.append((row_number, doc_type, name, str(e)))
+        try:
+            _worker_memory.sample()
+        except MemoryLimitExceeded as e:
+            # Hand back the rows already written; the parent stops the run
+            stopped = str(e)
+            break
+    _worker_memory.end_stage()
+    memory = _worker_memory.summary() if _worker_memory.enabled else None
+    return os.getpid(), text_mask_cache.stats(), memory, results, stopped
+
+def chunked(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def run_event(csv_file, doc_types, output_dir=None, workers=None, chunk_size=16,
+              report_file="run_report.json", shard=None, shard_strategy="hash", memory_options=None):
+    """
+    Generate every requested document for every participant in one pass
+    
+    The CSV is read once and each row is rendered into all requested document
+    types by the same worker, so templates and fonts are loaded once per
+    worker instead of once per script.
+    
+    Args:
+        csv_file (str): Participant CSV with name, email and faculty columns
+        doc_types (list): Document types to produce (keys of DOCUMENT_TYPES)
+        output_dir (str): Base folder for the outputs (default: each
+                          document's usual folder next to its script)
+        workers (int): Worker processes (default: CPU count, 1 runs inline)
+        chunk_size (int): Rows sent to a worker at a time
+        report_file (str): Where to write the JSON run report
+        shard (tuple): (index, count) to only process that shard of the rows
+        shard_strategy (str): "hash" or "range", see common.sharding.in_shard
+        memory_options (dict): MemoryMonitor arguments (profile, limit_mb,
+                               action) applied to this process and every worker
+    
+    Returns:
+        dict: The run report
+    """
+    missing = [p for doc_type in doc_types for p in (asset_path(doc_type, "template"), asset_path(doc_type, "font"))
+               if not os.path.exists(p)]
+    if not os.path.exists(csv_file):
+        missing.insert(0, csv_file)
+    if missing:
+        for path in missing:
+            print(f"Error: {path} not found!")
+        return None
+    
+    output_folders = {}
+    for doc_type in doc_types:
+        doc = DOCUMENT_TYPES[doc_type]
+        base = output_dir or os.path.join(REPO_ROOT, doc["folder"])
+        output_folders[doc_type] = os.path.join(base, doc["output"])
+        os.makedirs(output_folders[doc_type], exist_ok=True)
+    
+    memory = MemoryMonitor(**(memory_options or {}))
+    
+    # The ID card script already knows how to read and normalize the participant list
+    reader = load_script("id_card")
+    with memory.stage("read_csv"):
+        records = list(reader.read_participant_records(csv_file))
+    total_rows = len(records)
+    if shard:
+        records = [(row_number, fields) for row_number, fields in records
+                   if in_shard(shard, row_number, fields['name'].strip(), shard_strategy, total_rows)]
+        print(f"Shard {shard[0]}/{shard[1]}: {len(records)} of {total_rows} records")
+    workers = workers or os.cpu_count() or 1
+    
+    print(f"Processing {len(records)} records from {csv_file} into {', '.join(doc_types)} with {workers} workers...")
+    
+    started = time.perf_counter()
+    progress = ProgressReporter("event", total=len(records))
+    counts = {doc_type: {"created": 0, "failed": 0} for doc_type in doc_types}
+    failures = []
+    cache_stats = {}
+    worker_memory = {}
+    
+    # On a guard stop no new chunks are started, but chunks already in flight
+    # are still collected and the report is written with everything rendered
+    stopped = None
+    
+    def collect(worker_result):
+        nonlocal stopped
+        pid, stats, memory_summary, results, worker_stopped = worker_result
+        cache_stats[pid] = stats
+        if memory_summary:
+            worker_memory[pid] = memory_summary
+        failed_rows = set()
+        for row_number, doc_type, name, error in results:
+            if error is None:
+                counts[doc_type]["created"] += 1
+            else:
+                counts[doc_type]["failed"] += 1
+                failures.append({"row": row_number, "document": doc_type, "name": name, "reason": error})
+                failed_rows.add(row_number)
+        rows_done = len({row_number for row_number, _, _, _ in results})
+        progress.advance(rows_done, failed=len(failed_rows))
+        try:
+            if worker_stopped:
+                raise MemoryLimitExceeded(worker_stopped)
+            memory.sample()
+        except MemoryLimitExceeded as e:
+            stopped = stopped or str(e)
+    
+    memory.start_stage("render")
+    if workers == 1:
+        init_worker(doc_types, memory_options)
+        for chunk in chunked(records, chunk_size):
+            if stopped:
+                break
+            collect(render_rows(chunk, output_folders))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(doc_types, memory_options)) as pool:
+            # Keep only a couple of chunks per worker in flight so queued
+            # chunks and finished results never pile up in this process
+            pending = deque()
+            for chunk in chunked(records, chunk_size):
+                if len(pending) >= 2 * workers:
+                    collect(pending.popleft().result())
+                if stopped:
+                    break
+                pending.append(pool.submit(render_rows, chunk, output_folders))
+            while pending:
+                collect(pending.popleft().result())
+    
+    progress.close()
+    memory.end_stage()
+    
+    # Each worker has its own cache; sum the latest counters from every worker
+    text_cache = {key: sum(stats[key] for stats in cache_stats.values())
+                  for key in ('hits', 'misses', 'evictions', 'entries', 'bytes')}
+    lookups = text_cache['hits'] + text_cache['misses']
+    text_cache['hit_rate'] = round(text_cache['hits'] / lookups, 4) if lookups else 0.0
+    
+    report = {
+        "source": csv_file,
+        "documents": doc_types,
+        "shard": list(shard) if shard else None,
+        "shard_strategy": shard_strategy if shard else None,
+        "workers": workers,
+        "rows": len(records),
+        "elapsed_sec": round(time.perf_counter() - started, 2),
+        "output_folders": output_folders,
+        "counts": counts,
+        "text_mask_cache": text_cache,
+        "stopped": stopped,
+        "memory": {"main": memory.summary(), "workers": worker_memory} if memory.enabled else None,
+        "failures": sorted(failures, key=lambda f: (f["row"], f["document"])),
+    }
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    
+    if stopped:
+        print(f"\nStopped: {stopped}")
+    print(f"\nSummary ({report['elapsed_sec']}s):")
+    for doc_type, count in counts.items():
+        print(f"{doc_type}: {count['created']} created, {count['failed']} failed -> {output_folders[doc_type]}")
+    print(f"Text mask cache: {text_cache['hits']} hits, {text_cache['misses']} misses "
+          f"({text_cache['hit_rate']:.0%} hit rate)")
+    memory.print_summary()
+    print(f"Run report saved to '{report_file}'")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate ID cards and certificates for an event in one pass")
+    parser.add_argument("csv_file", help="Participant CSV (Full Name/name, Email Address/email, Faculty/faculty)")
+    parser.add_argument("--docs", default=",".join(DOCUMENT_TYPES),
+                       help=f"Comma-separated document types to produce (default: {','.join(DOCUMENT_TYPES)})")
+    parser.add_argument("--output-dir", default=None,
+                       help="Base folder for outputs (default: each script's usual output folder)")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=16,
+                       help="Rows handed to a worker at a time")
+    parser.add_argument("--report", default=None,
+                       help="Where to write the JSON run report (default: run_report.json, or "
+                            "run_report.shard-i-of-N.json with --shard, inside --output-dir if given)")
+    add_shard_arguments(parser)
+    add_memory_arguments(parser)
+    
+    args = parser.parse_args()
+    doc_types = [d.strip() for d in args.docs.split(",") if d.strip()]
+    unknown = [d for d in doc_types if d not in DOCUMENT_TYPES]
+    if unknown:
+        parser.error(f"unknown document type(s): {', '.join(unknown)}")
+    
+    # Keep the report next to the outputs so merge_shards.py finds it in each shard's folder
+    report_file = args.report or os.path.join(args.output_dir or "", f"run_report{shard_suffix(args.shard)}.json")
+    report = run_event(args.csv_file, doc_types, args.output_dir, args.workers, args.chunk_size,
+                       report_file, args.shard, args.shard_strategy,
+                       {"profile": args.mem_profile, "limit_mb": args.mem_limit_mb,
+                        "action": args.mem_limit_action})
+    if report is None or report["stopped"] or any(count["failed"] for count in report["counts"].values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file